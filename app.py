@@ -4,6 +4,7 @@ from components.footer import foot
 from components import layout_responsive
 from components.theme import get_theme
 from pages import db, appendix, home, solution, forecast
+from utils import metrics
 import threading
 import os
 import logging
@@ -46,37 +47,78 @@ def start_telegram_bot():
     except Exception as e:
         logger.error(f"Unexpected error in Telegram bot thread: {e}")
 
-@app('/site')
+# Routes get their own latency histogram; any other hash is counted as 'other'
+ROUTES = ('home', 'dashboard', 'forecast', 'solution', 'appendix')
+
+def on_startup():
+    # Load the dashboard dataset in the background, so neither startup nor the first #dashboard visit waits for it
+    db.warm_up()
+    metrics.registry.register_collector('vitalair_plot_cache', db.plot_cache.stats)
+    metrics.start()
+
+async def update_card(q: Q, name, inputs, build, *args):
+    """
+    Send a card only if its inputs changed since it was last sent to this client.
+    build(*args) creates the card and is run through q.run.
+    """
+    sent = q.client.sent_cards
+    if sent is None:
+        sent = q.client.sent_cards = {}
+    if name in sent and sent[name] == inputs:
+        return
+    with metrics.timer('vitalair_wave_run_seconds', card=name):
+        q.page[name] = await q.run(build, *args)
+    sent[name] = inputs
+
+def set_card(q: Q, name, inputs, card):
+    """Like update_card, for cards that are already built"""
+    sent = q.client.sent_cards
+    if sent is None:
+        sent = q.client.sent_cards = {}
+    if name in sent and sent[name] == inputs:
+        return
+    q.page[name] = card
+    sent[name] = inputs
+
+@app('/site', on_startup=on_startup)
 async def server(q: Q):
     # Note: Telegram bot is now running as a separate process through Railway
     # We don't need to start it in a thread from here
     
+    hash = q.args['#']
+    route = hash or 'home'
+    if route not in ROUTES:
+        route = 'other'
+    with metrics.timer('vitalair_wave_route_seconds', route=route):
+        await render(q, hash)
+    with metrics.timer('vitalair_wave_page_save_seconds', route=route):
+        await q.page.save()
+
+async def render(q: Q, hash):
+    """Set the cards of the page selected by hash"""
     # Apply the custom theme to the entire app
     if not q.client.initialized:
-        q.page['meta'] = await q.run(layout_responsive.meta_layout, q)
         q.page['theme'] = get_theme()
         q.client.initialized = True
-    else:
-        q.page['meta'] = await q.run(layout_responsive.meta_layout, q)
-        
-    q.page['header'] = await q.run(nav)
-    q.page['footer'] = await q.run(foot)
     
-    hash = q.args['#']
+    # Cards are only re-sent when their inputs change; the layout only depends on the route
+    await update_card(q, 'meta', (hash,), layout_responsive.meta_layout, q)
+    await update_card(q, 'header', (), nav)
+    await update_card(q, 'footer', (), foot)
     
     if (hash is None) or (hash == "home"):
         # Add all home page cards
         for card_name, card in home.home_page.items():
-            q.page[card_name] = card
+            set_card(q, card_name, (), card)
     elif hash == "dashboard":
         # q.page['state_pie'] = await q.run(db.state_pie_chart, q)
-        q.page['ss_mardown'] = db.ss_md_zone
-        q.page['aqi_mardown'] = db.aqi_md_zone
-        q.page['aqi_level_md'] = db.aqi_level_md_zone
+        set_card(q, 'ss_mardown', (), db.ss_md_zone)
+        set_card(q, 'aqi_mardown', (), db.aqi_md_zone)
+        set_card(q, 'aqi_level_md', (), db.aqi_level_md_zone)
         
 
         ## ------------------ AQI Level Distribution ------------------ ##
-        q.page['aqi_level'] = await q.run(db.aqi_level_bar, q)
+        await update_card(q, 'aqi_level', (), db.aqi_level_bar, q)
 
         ## ------------------ Cache the State-Station Pairs ------------------ ##
         if q.client.ss_state is None:
@@ -97,12 +139,13 @@ async def server(q: Q):
             q.client.ss_col = q.args.ss_col       
 
         ## ------------------ Distribution of Different Features in the Dataset ------------------ ##
-        q.page['ss_sidebar1'] = await q.run(db.ss_state_bar_menu, q)
-        q.page['ss_sidebar2'] = await q.run(db.ss_station_bar_menu, q)
-        q.page['ss_sidebar3'] = await q.run(db.ss_col_bar_menu, q)
+        ss_col = tuple(q.client.ss_col)
+        await update_card(q, 'ss_sidebar1', (), db.ss_state_bar_menu, q)
+        await update_card(q, 'ss_sidebar2', (q.client.ss_station,), db.ss_station_bar_menu, q)
+        await update_card(q, 'ss_sidebar3', (ss_col,), db.ss_col_bar_menu, q)
 
         if q.client.ss_station:
-            q.page['ss_body'] = await q.run(db.plot_ss_cols, q)
+            await update_card(q, 'ss_body', (q.client.ss_station, ss_col), db.plot_ss_cols, q)
 
         ## ------------------ AQI Dsitribution for State-Station Pairs ------------------ ##
         if q.client.state is None:
@@ -118,22 +161,34 @@ async def server(q: Q):
         if q.args.station or q.args.station == []:
             q.client.station = q.args.station
 
-        q.page['sidebar1'] = await q.run(db.state_bar_menu, q)
-        q.page['sidebar2'] = await q.run(db.station_bar_menu, q)
+        station = tuple(q.client.station)
+        await update_card(q, 'sidebar1', (), db.state_bar_menu, q)
+        await update_card(q, 'sidebar2', (station,), db.station_bar_menu, q)
 
         # if q.client.station or q.args.station == []:
-        q.page['body'] = await q.run(db.plot_aqi, q)
+        await update_card(q, 'body', (station,), db.plot_aqi, q)
     elif hash == "forecast":
         # Render the Forecast page cards with improved UI
-        page_cards = forecast.forecast_page(q)
-        for key, card in page_cards.items():
-            q.page[key] = card
+        location = q.args['forecast_location']
+        selected_date = q.args['selected_date']
+        version = forecast.data_version()
+        if version is None or q.client.sent_cards.get('forecast') != (location, selected_date, version):
+            page_cards = forecast.forecast_page(q)
+            for key, card in page_cards.items():
+                if version is None:
+                    # Error card: always send, and forget what was sent before
+                    q.page[key] = card
+                    q.client.sent_cards.pop(key, None)
+                elif key in forecast.date_cards:
+                    set_card(q, key, (location, selected_date, version), card)
+                else:
+                    set_card(q, key, (location, version), card)
+            q.client.sent_cards['forecast'] = (location, selected_date, version)
             
     elif hash == "solution":
-        q.page['solution'] = solution.sol_md
+        set_card(q, 'solution', (), solution.sol_md)
     elif hash == "appendix":
-        q.page['appendix'] = appendix.appendix
-    await q.page.save()
+        set_card(q, 'appendix', (), appendix.appendix)
 
 # Add this section for Railway deployment
 if __name__ == "__main__":
@@ -0,0 +1,5 @@
+"""
+Offline benchmarks of the VitalAir hot paths on synthetic data.
+
+Run with ``python -m benchmarks.run --help``.
+"""
@@ -0,0 +1,219 @@
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import logging
+import statistics
+from datetime import datetime
+
+from telegram import Update
+from telegram.request import BaseRequest
+
+from benchmarks.fake_bot_api import BOT_USER, make_update
+
+logger = logging.getLogger(__name__)
+
+MIXES = ('valid', 'invalid_date', 'unknown', 'range')
+
+
+class ReplySink(BaseRequest):
+    """
+    Bot API client that never touches the network: answers getMe and records every sendMessage.
+    Pass it to telegram_bot.build_application(request=...).
+    """
+
+    def __init__(self):
+        self.sent_at = {}
+        self.replied_at = {}
+        self.texts = {}
+        self._message_id = 0
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    @property
+    def read_timeout(self):
+        return None
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None, write_timeout=None,
+                         connect_timeout=None, pool_timeout=None):
+        api_method = url.rsplit('/', 1)[-1]
+        params = request_data.parameters if request_data is not None else {}
+        if api_method == 'getMe':
+            result = BOT_USER
+        elif api_method == 'sendMessage':
+            chat_id = int(params['chat_id'])
+            # Only the first reply of a chat counts for latency (long answers come in several chunks)
+            self.replied_at.setdefault(chat_id, time.perf_counter())
+            self.texts.setdefault(chat_id, params.get('text', ''))
+            self._message_id += 1
+            result = {'message_id': self._message_id, 'date': int(time.time()),
+                      'chat': {'id': chat_id, 'type': 'private'}, 'text': params.get('text', '')}
+        else:
+            result = True
+        return 200, json.dumps({'ok': True, 'result': result}).encode()
+
+
+def make_messages(snapshot, n, mix, seed=0):
+    """n message texts drawn from the forecast data, with kinds weighted by mix {kind: weight}"""
+    rng = random.Random(seed)
+    locations = snapshot.locations
+    dates = sorted(set(snapshot.forecast.date_strings(slice(None))))
+    kinds = rng.choices(list(mix), weights=list(mix.values()), k=n)
+
+    def display(date_str):
+        return datetime.strptime(date_str, "%Y-%m-%d").strftime("%d-%m-%Y")
+
+    messages = []
+    for kind in kinds:
+        location = rng.choice(locations)
+        if kind == 'valid':
+            messages.append(f"{location} {display(rng.choice(dates))}")
+        elif kind == 'invalid_date':
+            messages.append(rng.choice([f"{location} 2024-12-31", f"{location} 31-02-2025", f"{location} tomorrow"]))
+        elif kind == 'unknown':
+            # A typo of a real name: one character dropped
+            i = rng.randrange(len(location))
+            messages.append(f"{location[:i] + location[i + 1:]}x {display(rng.choice(dates))}")
+        else:
+            start, end = sorted(rng.sample(dates, 2))
+            messages.append(rng.choice([f"{location} week", f"{location} {display(start)}..{display(end)}"]))
+    return messages
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+async def run_level(application, sink, messages, rate, users, first_id, settle=5.0):
+    """
+    Put one update per message on the application's update queue at `rate` per second (all at once if 0)
+    and wait for the replies. Returns the level's throughput and latency summary.
+    """
+    from utils import metrics
+
+    shed_before = {reason: metrics.registry.counter('vitalair_bot_shed_total', reason=reason)
+                   for reason in ('user_rate', 'queue_full')}
+    chat_ids = []
+    start = time.perf_counter()
+    for i, text in enumerate(messages):
+        if rate:
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        update_id = first_id + i
+        chat_id = update_id
+        update = Update.de_json(make_update(update_id, chat_id, text, user_id=1 + i % users if users else None),
+                                application.bot)
+        sink.sent_at[chat_id] = time.perf_counter()
+        chat_ids.append(chat_id)
+        await application.update_queue.put(update)
+    sent_seconds = time.perf_counter() - start
+
+    # Wait for the replies; silently shed messages never get one
+    deadline = time.perf_counter() + settle
+    replied = 0
+    while time.perf_counter() < deadline:
+        now_replied = sum(1 for chat_id in chat_ids if chat_id in sink.replied_at)
+        if now_replied == len(chat_ids):
+            break
+        if now_replied != replied:
+            replied = now_replied
+            deadline = time.perf_counter() + settle
+        await asyncio.sleep(0.05)
+
+    latencies = [(sink.replied_at[c] - sink.sent_at[c]) * 1000 for c in chat_ids if c in sink.replied_at]
+    # 'busy' and 'too quickly' replies
+    shed_replies = sum(1 for c in chat_ids if sink.texts.get(c, '').startswith('⏳'))
+    last_reply = max((sink.replied_at[c] for c in chat_ids if c in sink.replied_at), default=start)
+    return {
+        'rate': rate,
+        'messages': len(messages),
+        'send_seconds': sent_seconds,
+        'replied': len(latencies),
+        'shed_replies': shed_replies,
+        'shed_user_rate': metrics.registry.counter('vitalair_bot_shed_total', reason='user_rate') - shed_before['user_rate'],
+        'shed_queue_full': metrics.registry.counter('vitalair_bot_shed_total', reason='queue_full') - shed_before['queue_full'],
+        'throughput': len(latencies) / max(last_reply - start, 1e-9),
+        'p50_ms': statistics.median(latencies) if latencies else None,
+        'p95_ms': _percentile(latencies, 0.95) if latencies else None,
+        'p99_ms': _percentile(latencies, 0.99) if latencies else None,
+    }
+
+
+async def run(rates, duration, mix, users, burst=1000, seed=0):
+    """Drive the bot's registered handlers at each offered rate in turn"""
+    import telegram_bot
+    from utils import forecast_store
+
+    snapshot = forecast_store.get_snapshot()
+    sink = ReplySink()
+    application = telegram_bot.build_application('123456:TEST', request=sink)
+    await application.initialize()
+    await application.start()
+    try:
+        first_id = 1
+        for rate in rates:
+            n = int(rate * duration) if rate else burst
+            messages = make_messages(snapshot, n, mix, seed=seed + first_id)
+            result = await run_level(application, sink, messages, rate, users, first_id)
+            first_id += n
+            yield result
+    finally:
+        await application.stop()
+        await application.shutdown()
+        telegram_bot.shutdown_executor()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Offline load test of the Telegram bot handlers with synthetic updates and a stubbed reply sink.')
+    parser.add_argument('--rate', type=float, nargs='+', default=[100, 250, 500, 1000, 2000],
+                        help='offered messages per second, one level each (0: send --burst messages at once)')
+    parser.add_argument('--duration', type=float, default=3.0, help='seconds per level')
+    parser.add_argument('--burst', type=int, default=1000, help='messages of a rate 0 level')
+    parser.add_argument('--mix', default='valid=0.8,invalid_date=0.1,unknown=0.1',
+                        help=f"weights of the message kinds ({', '.join(MIXES)})")
+    parser.add_argument('--users', type=int, default=0,
+                        help='distinct senders cycled through (0: every message from a new user)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the results as JSON')
+    args = parser.parse_args(argv)
+
+    mix = {}
+    for part in args.mix.split(','):
+        kind, weight = part.split('=')
+        if kind not in MIXES:
+            parser.error(f"unknown message kind '{kind}'")
+        mix[kind] = float(weight)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    # The invalid-date messages of the mix would log one error each
+    logging.getLogger('telegram_bot').setLevel(logging.CRITICAL)
+
+    async def collect():
+        results = []
+        async for result in run(args.rate, args.duration, mix, args.users, args.burst, args.seed):
+            results.append(result)
+            def ms(value):
+                return f"{value:8.1f}" if value is not None else "       -"
+            print(f"offered {result['rate']:>7.0f}/s  answered {result['throughput']:8.0f}/s  "
+                  f"replied {result['replied']:>6}/{result['messages']:<6} shed {result['shed_replies']:>5}  "
+                  f"p50 {ms(result['p50_ms'])} ms  p95 {ms(result['p95_ms'])} ms  p99 {ms(result['p99_ms'])} ms")
+        return results
+
+    results = asyncio.run(collect())
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'mix': mix, 'users': args.users, 'results': results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+import sys
+import json
+import time
+import asyncio
+import argparse
+import logging
+import statistics
+from urllib.parse import parse_qsl
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+logger = logging.getLogger(__name__)
+
+BOT_USER = {'id': 1000001, 'is_bot': True, 'first_name': 'VitalAir', 'username': 'vitalair_test_bot'}
+
+
+def _chat(chat_id):
+    return {'id': chat_id, 'type': 'private', 'first_name': 'Load'}
+
+
+def make_update(update_id, chat_id, text, user_id=None):
+    """JSON of a Telegram text message update (sent by user_id, the chat's own user by default)"""
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': _chat(chat_id),
+            'from': {'id': user_id or chat_id, 'is_bot': False, 'first_name': 'Load'},
+            'text': text,
+        },
+    }
+
+
+class FakeBotAPI:
+    """
+    Local stand-in for the Telegram Bot API (point the bot's base_url at it).
+    Serves getUpdates from a queue, accepts setWebhook and records every sendMessage.
+    """
+
+    def __init__(self):
+        self.webhook_url = None
+        self.webhook_set = asyncio.Event()
+        self.polling = asyncio.Event()
+        self.sent = []
+        self._updates = []
+        self._updates_ready = asyncio.Condition()
+        self._message_id = 0
+        self._replied = {}
+
+    def push_update(self, update):
+        """Queue an update for getUpdates"""
+        self._updates.append(update)
+        asyncio.ensure_future(self._notify())
+
+    async def _notify(self):
+        async with self._updates_ready:
+            self._updates_ready.notify_all()
+
+    def expect_reply(self, chat_id):
+        """Future resolved with the time of the next message sent to chat_id"""
+        future = asyncio.get_running_loop().create_future()
+        self._replied[chat_id] = future
+        return future
+
+    async def _get_updates(self, params):
+        offset = int(params.get('offset', 0) or 0)
+        limit = int(params.get('limit', 100) or 100)
+        timeout = float(params.get('timeout', 0) or 0)
+        self._updates = [u for u in self._updates if u['update_id'] >= offset]
+        self.polling.set()
+        if not self._updates and timeout:
+            async with self._updates_ready:
+                try:
+                    # Short long-poll so the bot shuts down quickly
+                    await asyncio.wait_for(self._updates_ready.wait(), min(timeout, 1.0))
+                except asyncio.TimeoutError:
+                    pass
+        return self._updates[:limit]
+
+    def _send_message(self, params):
+        chat_id = int(params['chat_id'])
+        self._message_id += 1
+        self.sent.append((chat_id, params.get('text', '')))
+        future = self._replied.pop(chat_id, None)
+        if future is not None and not future.done():
+            future.set_result(time.perf_counter())
+        return {'message_id': self._message_id, 'date': int(time.time()), 'chat': _chat(chat_id),
+                'from': BOT_USER, 'text': params.get('text', '')}
+
+    async def _handle(self, request):
+        # The bot posts url-encoded forms (multipart only for file uploads, which it never sends)
+        params = {}
+        for key, value in parse_qsl((await request.body()).decode()):
+            try:
+                params[key] = json.loads(value)
+            except (TypeError, ValueError):
+                params[key] = value
+        method = request.path_params['method']
+
+        if method == 'getMe':
+            result = BOT_USER
+        elif method == 'getUpdates':
+            result = await self._get_updates(params)
+        elif method == 'setWebhook':
+            self.webhook_url = params['url']
+            self.webhook_set.set()
+            result = True
+        elif method == 'deleteWebhook':
+            self.webhook_url = None
+            result = True
+        elif method == 'sendMessage':
+            result = self._send_message(params)
+        elif method in ('answerInlineQuery', 'close', 'logOut'):
+            result = True
+        else:
+            return JSONResponse({'ok': False, 'error_code': 404, 'description': 'Not Found'}, status_code=404)
+        return JSONResponse({'ok': True, 'result': result})
+
+    def app(self):
+        return Starlette(routes=[Route('/bot{token}/{method}', self._handle, methods=['GET', 'POST'])])
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+async def run(mode, messages, concurrency, api_port, webhook_port):
+    """Serve the bot against a FakeBotAPI and time the replies to a burst of messages"""
+    import uvicorn
+    import httpx
+    import telegram_bot
+
+    api = FakeBotAPI()
+    api_server = uvicorn.Server(uvicorn.Config(api.app(), host='127.0.0.1', port=api_port, log_level='warning'))
+    api_task = asyncio.create_task(api_server.serve())
+    while not api_server.started:
+        await asyncio.sleep(0.01)
+
+    telegram_bot.BOT_API_URL = f"http://127.0.0.1:{api_port}"
+    telegram_bot.WEBHOOK_URL = f"http://127.0.0.1:{webhook_port}"
+    telegram_bot.WEBHOOK_PORT = webhook_port
+    telegram_bot.ALERTS_ENABLED = False
+    application = telegram_bot.build_application('123456:TEST')
+    bot_task = asyncio.create_task(telegram_bot.serve(application, mode))
+    ready = api.webhook_set if mode == 'webhook' else api.polling
+    await asyncio.wait_for(ready.wait(), 30)
+    if mode == 'webhook':
+        # Wait until the receiver accepts connections
+        while telegram_bot._webhook_server is None or not telegram_bot._webhook_server.started:
+            await asyncio.sleep(0.01)
+
+    queries = ['Alandur 31-12-2024', 'Ooty 05-01-2025', 'salem 05-01-2025', 'Vellore 27-01-2025', 'Alandur 1-1-2025']
+    limit = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async with httpx.AsyncClient() as client:
+        async def send(i):
+            async with limit:
+                chat_id = 10_000 + i
+                replied = api.expect_reply(chat_id)
+                update = make_update(i + 1, chat_id, queries[i % len(queries)])
+                start = time.perf_counter()
+                if mode == 'webhook':
+                    await client.post(api.webhook_url, json=update)
+                else:
+                    api.push_update(update)
+                latencies.append(await asyncio.wait_for(replied, 60) - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(send(i) for i in range(messages)))
+        elapsed = time.perf_counter() - start
+
+    telegram_bot.request_stop()
+    await bot_task
+    api_server.should_exit = True
+    await api_task
+
+    latencies_ms = [latency * 1000 for latency in latencies]
+    return {
+        'mode': mode,
+        'messages': messages,
+        'concurrency': concurrency,
+        'seconds': elapsed,
+        'messages_per_second': messages / elapsed,
+        'p50_ms': statistics.median(latencies_ms),
+        'p95_ms': _percentile(latencies_ms, 0.95),
+        'p99_ms': _percentile(latencies_ms, 0.99),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time the Telegram bot end to end against a local fake Bot API (offline).')
+    parser.add_argument('--mode', choices=['polling', 'webhook'], nargs='+', default=['polling', 'webhook'])
+    parser.add_argument('--messages', type=int, default=500, help='messages sent per mode')
+    parser.add_argument('--concurrency', type=int, default=50, help='messages in flight at once')
+    parser.add_argument('--api-port', type=int, default=18081)
+    parser.add_argument('--webhook-port', type=int, default=18082)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    for mode in args.mode:
+        result = asyncio.run(run(mode, args.messages, args.concurrency, args.api_port, args.webhook_port))
+        print(f"{result['mode']:<8} {result['messages']} messages in {result['seconds']:.2f} s "
+              f"({result['messages_per_second']:.0f}/s)  p50 {result['p50_ms']:.1f} ms  "
+              f"p95 {result['p95_ms']:.1f} ms  p99 {result['p99_ms']:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+import sys
+import json
+import time
+import argparse
+import logging
+import warnings
+
+from benchmarks import synthetic
+
+logger = logging.getLogger(__name__)
+
+# Rows predicted after each fit
+PREDICT_ROWS = 1000
+
+
+def run_size(n_rows, methods, exact_max_rows, seed=0):
+    """Fit (including the alpha search) and predict time of each GP backend on n_rows synthetic training rows"""
+    from vitalair import models
+    X, y = synthetic.make_training_rows(n_rows + PREDICT_ROWS, seed=seed)
+    X_train, y_train, X_test, y_test = X[:n_rows], y[:n_rows], X[n_rows:], y[n_rows:]
+    for method in methods:
+        result = {'rows': n_rows, 'method': method}
+        if method == 'exact' and n_rows > exact_max_rows:
+            # The exact GP holds several n x n matrices (the kernel and its gradients) and factorizes them O(n³)
+            result['skipped'] = f"more than {exact_max_rows} rows ({3 * 8 * n_rows ** 2 / 1e9:.1f} GB of kernel gradients)"
+            yield result
+            continue
+        start = time.perf_counter()
+        model = models.fit_gpr(X_train, y_train, seed=seed, method=method)
+        result['fit_s'] = time.perf_counter() - start
+        start = time.perf_counter()
+        predictions = model.predict(X_test)
+        result['predict_ms'] = (time.perf_counter() - start) * 1000
+        result['alpha'] = float(model.alpha)
+        result.update({f"test_{name}": value for name, value in models.evaluate(y_test, predictions).items()})
+        yield result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the exact and approximate GP backends on synthetic station data.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000], help='training rows')
+    parser.add_argument('--methods', nargs='+', default=['approx', 'exact'], choices=['approx', 'exact'])
+    parser.add_argument('--exact-max-rows', type=int, default=2000,
+                        help='skip the exact GP above this many rows (it needs O(n²) memory and O(n³) time)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the results as JSON')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    from sklearn.exceptions import ConvergenceWarning
+    warnings.filterwarnings('ignore', category=ConvergenceWarning)
+
+    results = []
+    for n_rows in args.rows:
+        for result in run_size(n_rows, args.methods, args.exact_max_rows, args.seed):
+            results.append(result)
+            if 'skipped' in result:
+                print(f"{result['method']:<7} {n_rows:>8} rows  skipped: {result['skipped']}")
+            else:
+                print(f"{result['method']:<7} {n_rows:>8} rows  fit {result['fit_s']:9.2f} s  "
+                      f"predict {PREDICT_ROWS} rows {result['predict_ms']:8.2f} ms  "
+                      f"test RMSE {result['test_rmse']:6.3f}  R² {result['test_r2']:6.4f}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'predict_rows': PREDICT_ROWS, 'results': results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import warnings
+
+logger = logging.getLogger(__name__)
+
+
+def _until(frames, date):
+    return {location: df[df.index <= date] for location, df in frames.items()}
+
+
+def _forecast_mae(step, frames, history, horizon):
+    """MAE of the AQI forecast from `history` over the next `horizon` days, against the observations in frames"""
+    import numpy as np
+    from vitalair import forecast
+    table = forecast.forecast(step, history, horizon)
+    errors = []
+    for location, df in table.groupby('Location'):
+        actual = frames[location]['AQI'].reindex(df['Date'])
+        errors.append(np.abs(df['AQI_Forecast'].to_numpy() - actual.to_numpy()))
+    errors = np.concatenate(errors)
+    return float(np.nanmean(errors))
+
+
+def run(frames, days, chunk, epochs, update_epochs, seed=0):
+    """
+    Train on all but the last `days` days, then add them `chunk` days at a time. After each chunk, update
+    one copy of the models incrementally and retrain another from scratch, and compare their time and the
+    error of their forecasts of the next chunk. Yields one result per chunk.
+    """
+    import pandas as pd
+    import tensorflow as tf
+    from vitalair import forecast
+
+    tf.keras.utils.set_random_seed(seed)
+    end = max(df.index.max() for df in frames.values())
+    start = end - pd.Timedelta(days=days)
+    start_time = time.perf_counter()
+    incremental, _, _ = forecast.fit_step_ensemble(_until(frames, start), epochs=epochs, seed=seed)
+    logger.warning(f"Initial training up to {start:%Y-%m-%d} in {time.perf_counter() - start_time:.1f} s")
+
+    date = start + pd.Timedelta(days=chunk)
+    while date + pd.Timedelta(days=chunk) <= end:
+        history = _until(frames, date)
+        start_time = time.perf_counter()
+        windows = forecast.update_step_ensemble(incremental, history, update_epochs)
+        update_s = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        full, _, _ = forecast.fit_step_ensemble(history, epochs=epochs, seed=seed)
+        full_s = time.perf_counter() - start_time
+        update_mae = _forecast_mae(incremental, frames, history, chunk)
+        full_mae = _forecast_mae(full, frames, history, chunk)
+        yield {'date': f"{date:%Y-%m-%d}", 'new_windows': windows, 'update_s': update_s, 'full_s': full_s,
+               'update_mae': update_mae, 'full_mae': full_mae, 'drift': update_mae - full_mae}
+        date += pd.Timedelta(days=chunk)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Compare incremental updates of the forecasting models with full retraining on the station files.')
+    parser.add_argument('--data-dir', help='data directory (default: ./data)')
+    parser.add_argument('--days', type=int, default=56, help='days at the end of the data added incrementally')
+    parser.add_argument('--chunk', type=int, default=7, help='days added per update (and forecast after it)')
+    parser.add_argument('--epochs', type=int, default=50, help='epochs of a full training')
+    parser.add_argument('--update-epochs', type=int, default=None, help='epochs of an incremental update')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the results as JSON')
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    from sklearn.exceptions import ConvergenceWarning
+    warnings.filterwarnings('ignore', category=ConvergenceWarning)
+    from utils import load_data
+    from vitalair import forecast
+    from vitalair.data import STATIONS_DIR, read_station, station_files
+
+    files = station_files(os.path.join(os.path.abspath(args.data_dir or load_data.DIR), STATIONS_DIR))
+    frames = {location: read_station(path) for location, path in files.items()}
+    update_epochs = args.update_epochs or forecast.UPDATE_EPOCHS
+
+    results = []
+    for result in run(frames, args.days, args.chunk, args.epochs, update_epochs, args.seed):
+        results.append(result)
+        print(f"{result['date']}  +{result['new_windows']:>4} station-days  update {result['update_s']:6.2f} s  "
+              f"full {result['full_s']:7.2f} s  {args.chunk}-day MAE update {result['update_mae']:6.3f}  "
+              f"full {result['full_mae']:6.3f}  drift {result['drift']:+.3f}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'days': args.days, 'chunk': args.chunk, 'epochs': args.epochs, 'update_epochs': update_epochs,
+                       'results': results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import logging
+import platform
+import tempfile
+import statistics
+import subprocess
+from types import SimpleNamespace
+from datetime import datetime, timezone
+
+from benchmarks import synthetic
+
+logger = logging.getLogger(__name__)
+
+
+def _timings(fn, repeat, setup=None):
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _summary(name, scale, timings):
+    timings_ms = sorted(t * 1000 for t in timings)
+    return {
+        'name': name,
+        **scale,
+        'repeat': len(timings_ms),
+        'min_ms': timings_ms[0],
+        'median_ms': statistics.median(timings_ms),
+        'p95_ms': timings_ms[min(len(timings_ms) - 1, int(round(0.95 * (len(timings_ms) - 1))))],
+        'max_ms': timings_ms[-1],
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_scale(directory, n_stations, years, repeat, seed=0):
+    """Generate one synthetic dataset in directory and time every entry point on it"""
+    from utils import load_data, forecast_store
+    from pages import db, forecast
+    import telegram_bot
+
+    scale = {'stations': n_stations, 'years': years}
+    logger.info(f"Generating {n_stations} stations x {years} years in {directory}")
+    synthetic.write_dataset(directory, n_stations, years, seed=seed)
+
+    load_data.DIR = directory
+    forecast_store.reset_store()
+    results = []
+
+    # ---- load_data: CSV parse, then the binary copy ---- #
+    train_path = os.path.join(os.path.abspath(directory), 'train.csv')
+    binary_path = load_data.cache_path(train_path)
+    if os.path.exists(binary_path):
+        os.remove(binary_path)
+    results.append(_summary('load_data.csv', scale, _timings(lambda: load_data.load_data('train.csv'), repeat)))
+    load_data.convert_csv(train_path)
+    results.append(_summary('load_data.binary', scale, _timings(lambda: load_data.load_data('train.csv'), repeat)))
+
+    # ---- Dashboard plots, with and without the payload cache ---- #
+    db.reload()
+    station_ids = list(range(1, n_stations + 1))
+    rng = random.Random(seed)
+    q_aqi = SimpleNamespace(client=SimpleNamespace(station=[str(stn) for stn in station_ids[:12]]))
+    q_ss = SimpleNamespace(client=SimpleNamespace(ss_station=str(station_ids[-1]), ss_col=['NO2', 'O3', 'CO', 'PM10', 'PM2_5', 'AQI']))
+    results.append(_summary('db.plot_aqi', scale, _timings(lambda: db.plot_aqi(q_aqi), repeat, setup=db.plot_cache.clear)))
+    results.append(_summary('db.plot_aqi.cached', scale, _timings(lambda: db.plot_aqi(q_aqi), repeat)))
+    results.append(_summary('db.plot_ss_cols', scale, _timings(lambda: db.plot_ss_cols(q_ss), repeat, setup=db.plot_cache.clear)))
+    results.append(_summary('db.plot_ss_cols.cached', scale, _timings(lambda: db.plot_ss_cols(q_ss), repeat)))
+
+    # ---- Forecast page and bot queries ---- #
+    snapshot = forecast_store.get_snapshot()
+    locations = snapshot.locations
+    dates = snapshot.forecast.date_strings(snapshot.forecast.location_slice(locations[0]))
+
+    def forecast_args():
+        return {'forecast_location': rng.choice(locations), 'selected_date': rng.choice(dates)}
+
+    results.append(_summary('forecast_page', scale,
+                            _timings(lambda: forecast.forecast_page(SimpleNamespace(args=forecast_args())), repeat)))
+
+    def bot_query():
+        date = datetime.strptime(rng.choice(dates), '%Y-%m-%d').strftime('%d-%m-%Y')
+        return f"{rng.choice(locations)} {date}"
+
+    results.append(_summary('handle_location_date_query', scale,
+                            _timings(lambda: telegram_bot.handle_location_date_query(bot_query()), repeat)))
+    return results
+
+
+def compare(baseline_path, results_path, threshold=0.10):
+    """Print the median change of every benchmark against a baseline results file"""
+    with open(baseline_path) as f:
+        baseline = {(r['name'], r['stations'], r['years']): r for r in json.load(f)['results']}
+    with open(results_path) as f:
+        current = json.load(f)['results']
+
+    regressions = 0
+    for result in current:
+        key = (result['name'], result['stations'], result['years'])
+        if key not in baseline:
+            continue
+        before, after = baseline[key]['median_ms'], result['median_ms']
+        change = (after - before) / before if before else 0.0
+        flag = ''
+        if change > threshold:
+            flag = '  <-- regression'
+            regressions += 1
+        print(f"{key[0]:<30} {key[1]:>6} stations {key[2]:>4} years  {before:10.3f} -> {after:10.3f} ms  {change:+7.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the VitalAir hot paths on synthetic data (offline).')
+    parser.add_argument('--stations', type=int, nargs='+', default=[12, 500], help='station counts (e.g. 12 500 5000)')
+    parser.add_argument('--years', type=float, nargs='+', default=[1], help='years of daily observations (e.g. 1 5)')
+    parser.add_argument('--repeat', type=int, default=20, help='timed calls per benchmark')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark_results.json', help='machine-readable results file')
+    parser.add_argument('--compare', metavar='BASELINE', help='results file of an earlier commit to compare against')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    import pandas as pd
+    import numpy as np
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='vitalair-bench-') as tmp:
+        for n_stations in args.stations:
+            for years in args.years:
+                directory = os.path.join(tmp, f"{n_stations}x{years}")
+                for result in run_scale(directory, n_stations, years, args.repeat, seed=args.seed):
+                    results.append(result)
+                    print(f"{result['name']:<30} {n_stations:>6} stations {years:>4} years  "
+                          f"median {result['median_ms']:10.3f} ms  p95 {result['p95_ms']:10.3f} ms")
+
+    report = {
+        'commit': _git_commit(),
+        'created': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Wrote {args.output}")
+
+    if args.compare:
+        return 1 if compare(args.compare, args.output) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
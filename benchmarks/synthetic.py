@@ -0,0 +1,77 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Same scale as the real forecast reference (75th percentile of the AQI forecasts)
+REFERENCE_AQI = 32.32735
+MEASURES = ['PM2.5', 'PM10', 'NO2', 'CO', 'O3']
+
+
+def location_names(n_stations):
+    """Forecast location names; the first one is always 'Alandur' like the real data"""
+    return ['Alandur'] + [f"Station_{i:05d}" for i in range(2, n_stations + 1)]
+
+
+def _random_walk(rng, n_series, n_days, start, scale):
+    steps = rng.normal(0, scale, size=(n_series, n_days))
+    return np.abs(start + steps.cumsum(axis=1))
+
+
+def make_observations(n_stations, years, seed=0, start='2023-01-01'):
+    """Daily observations shaped like data/train.csv"""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=int(365 * years), freq='D')
+    n_days = len(dates)
+    station_ids = np.repeat(np.arange(1, n_stations + 1), n_days)
+    all_dates = np.tile(dates.to_numpy(), n_stations)
+
+    df = pd.DataFrame({
+        'StateCode': 'TN',
+        'StationId': station_ids,
+        'Date': pd.DatetimeIndex(all_dates).strftime('%d-%m-%y'),
+    })
+    df.insert(0, 'ID_Date', 'TN_' + df.StationId.astype(str) + '_' + pd.DatetimeIndex(all_dates).strftime('%Y-%m-%d'))
+    for measure in MEASURES:
+        df[measure] = _random_walk(rng, n_stations, n_days, 4.0, 0.05).ravel()
+    df['AQI'] = _random_walk(rng, n_stations, n_days, 40.0, 2.0).ravel()
+    df['HIS'] = df[MEASURES].mean(axis=1)
+    df['HRI_Normalized'] = df['HIS'] / 500
+    df['HRI_Category'] = np.where(df['HRI_Normalized'] < 0.5, 'Low', 'High')
+    return df
+
+
+def make_forecasts(n_stations, horizon=28, seed=0, start='2024-12-31'):
+    """AQI and HRI forecast frames shaped like data/combined_*_forecast.csv"""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=horizon, freq='D').strftime('%Y-%m-%d')
+    locations = location_names(n_stations)
+    aqi = _random_walk(rng, n_stations, horizon, 40.0, 5.0).ravel()
+    aqi_df = pd.DataFrame({
+        'Date': np.tile(dates, n_stations),
+        'AQI_Forecast': aqi,
+        'Location': np.repeat(locations, horizon),
+    })
+    hri_df = aqi_df[['Date', 'AQI_Forecast']].copy()
+    hri_df['HRI'] = hri_df['AQI_Forecast'] / REFERENCE_AQI
+    hri_df['Location'] = aqi_df['Location']
+    return aqi_df, hri_df
+
+
+def make_training_rows(n_rows, seed=0):
+    """(features, AQI) shaped like one station's training file: log-scale pollutants and a nonlinear AQI"""
+    rng = np.random.default_rng(seed)
+    features = rng.normal([3.5, 4.1, 3.1, 0.7, 2.6], [0.6, 0.5, 0.7, 0.2, 0.6], size=(n_rows, len(MEASURES)))
+    pm25, pm10, no2, co, o3 = features.T
+    aqi = 8 * np.maximum(pm25, pm10 - 0.5) + 4 * np.sin(2 * no2) + 3 * co * o3 + rng.normal(0, 0.5, n_rows)
+    return pd.DataFrame(features, columns=MEASURES), pd.Series(aqi, name='AQI')
+
+
+def write_dataset(directory, n_stations, years, horizon=28, seed=0):
+    """Write train.csv and the joined forecast table (as built by utils.build_forecast) into directory"""
+    from utils.build_forecast import COLUMNS, FORECAST_FILE, write_forecast_table
+    os.makedirs(directory, exist_ok=True)
+    make_observations(n_stations, years, seed=seed).to_csv(os.path.join(directory, 'train.csv'), index=False)
+    aqi_df, hri_df = make_forecasts(n_stations, horizon=horizon, seed=seed)
+    table = aqi_df.assign(HRI=hri_df['HRI'])[COLUMNS].sort_values(by=['Location', 'Date'], kind='stable')
+    write_forecast_table(table.reset_index(drop=True), os.path.join(directory, FORECAST_FILE))
+    return directory
@@ -1,27 +1,86 @@
-import io 
-import base64
-import pandas as pd
-import matplotlib.pyplot as plt
+import os
+import logging
+import threading
 from h2o_wave import ui, data
 
-from utils.load_data import load_data
-
-# Load dataset
-df = load_data("train.csv")
-df.dropna(inplace=True)
-df.sort_values(by=['StateCode', 'StationId', 'Date'], inplace=True)
-df.StationId = df.StationId.astype('str')
-df.Date = df.Date.astype('str')
-state_count = df.StateCode.value_counts(normalize=True)
-state_count = state_count.reset_index()
-state_count['color'] = ['#008000']
-df.set_index(["StateCode", "StationId"], inplace=True)
-df.rename(columns={'PM2.5': 'PM2_5'}, inplace=True)
-
-aqi_levels = pd.DataFrame({'AQI_Levels': [50, 100, 200, 300, 400, 500], 'column': ['AQI', 'AQI', 'AQI', 'AQI', 'AQI', 'AQI'], 'level': ['Good', 'Satisfactory', 'Moderately polluted', 'Poor', 'Very Poor', 'Severe']})
+from utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Ready-to-send plot data keyed by (plot, station selection, feature selection)
+plot_cache = LRUCache(maxsize=int(os.getenv("VITALAIR_PLOT_CACHE_SIZE", "128")))
+
+def _cached_plot_data(key, build):
+    def build_and_log():
+        payload = build()
+        logger.debug(f"Plot cache miss for {key}: {plot_cache.stats()}")
+        return payload
+    return plot_cache.get_or_create(key, build_and_log)
+
+# The dataset is loaded on first use (or by warm_up()) instead of at import time
+_df = None
+_blocks = None
+_state_count = None
+_load_lock = threading.Lock()
+
+def _load():
+    global _df, _blocks, _state_count
+    # Imported here so that importing the page does not pull in pandas
+    from utils import shared_data
+    from utils.load_data import load_data
+    from utils.compact import compact_frame, station_blocks
+    # The published copy is already compacted and its columns are shared with the other processes
+    df = shared_data.attach('train')
+    if df is not None:
+        df = df.set_index(["StateCode", "StationId"])
+    else:
+        df = compact_frame(load_data("train.csv"))
+    state_count = df.index.get_level_values('StateCode').value_counts(normalize=True)
+    state_count = state_count.reset_index()
+    state_count['color'] = ['#008000']
+    state_count['state'] = state_count['StateCode'].map(state_dict)
+    _state_count = state_count
+    _blocks = station_blocks(df)
+    _df = df
+    # Cached plot data was built from the previous dataset
+    plot_cache.clear()
+
+def get_df():
+    """Return the dashboard dataset, loading it on first use"""
+    if _df is None:
+        with _load_lock:
+            if _df is None:
+                _load()
+    return _df
+
+def reload():
+    """Load the dataset again (e.g. after the data directory changed)"""
+    with _load_lock:
+        _load()
+
+def select_stations(stations, columns):
+    """Rows of the given Tamil Nadu stations, looked up through the per-station row ranges"""
+    from utils.compact import take_stations
+    df = get_df()
+    return take_stations(df, _blocks, [('TN', str(stn)) for stn in stations], columns)
+
+def get_state_count():
+    get_df()
+    return _state_count
+
+def warm_up():
+    """Load the dashboard dataset in a background thread"""
+    def run():
+        try:
+            get_df()
+        except Exception as e:
+            logger.error(f"Error loading dashboard data: {e}")
+    threading.Thread(target=run, name='db-warm-up', daemon=True).start()
+
+aqi_levels_fields = ['AQI_Levels', 'column', 'level']
+aqi_levels_rows = [[aqi_level, 'AQI', level] for aqi_level, level in zip([50, 100, 200, 300, 400, 500], ['Good', 'Satisfactory', 'Moderately polluted', 'Poor', 'Very Poor', 'Severe'])]
 
 state_dict = { 'TN': 'Tamil Nadu' }
-state_count['state'] = state_count['StateCode'].map(state_dict)
 
 states = [
     ui.choice('TN', 'Tamil Nadu')
@@ -51,7 +110,7 @@ color_palette = {
 }
 
 def state_pie_chart(q):
-    pie_list = [ui.pie(label=f"{value['index']}", value=f"", fraction=value['StateCode'], color=value['color']) for key, value in state_count.iterrows()]
+    pie_list = [ui.pie(label=f"{value['index']}", value=f"", fraction=value['StateCode'], color=value['color']) for key, value in get_state_count().iterrows()]
     state_pie = ui.wide_pie_stat_card(
         box='state_pie',
         title='State Distribution',
@@ -60,7 +119,7 @@ def state_pie_chart(q):
     return state_pie
 
 def state_aqi_chart(q):
-    tb = df.reset_index()
+    tb = get_df().reset_index()
 
     # aqi_level_bar = ui.plot_card(
     #     box = 'state_aqi',
@@ -76,7 +135,7 @@ def aqi_level_bar(q):
     aqi_level_bar = ui.plot_card(
         box = 'aqi_level',
         title='AQI Levels',
-        data=data(fields=aqi_levels.columns.tolist(), rows=aqi_levels.values.tolist()),
+        data=data(fields=aqi_levels_fields, rows=aqi_levels_rows),
         plot=ui.plot([
             ui.mark(type='interval', x='=AQI_Levels', y='=column', label='=level', color='level', stack='auto', label_position='middle', x_nice=True),
             ]))
@@ -107,16 +166,26 @@ def ss_col_bar_menu(q):
         ])
     return ss_col_bar
 
+def ss_cols_data(station, columns):
+    """Plot data for the selected features of one station, built once per selection"""
+    def build():
+        from utils.compact import to_rows
+        from utils.downsample import downsample_frame
+        tb = select_stations([station], ['Date'] + list(columns))
+        tb.reset_index(inplace=True)
+        tb = downsample_frame(tb, 'Date', list(columns))
+        return data(
+                fields = tb.columns.tolist(), 
+                rows = to_rows(tb))
+    return _cached_plot_data(('ss_cols', station, tuple(columns)), build)
+
 def plot_ss_cols(q):
-    tb = df.loc[('TN', q.client.ss_station), ['Date'] + q.client.ss_col]
-    tb.reset_index(inplace=True)
-    lines = [ui.mark(type='line', x='=Date', y=f'={column}', x_scale='time', color=color_palette[column], label=column.replace("_", "."), size="100%") for column in tb.columns[3:]]
+    ss_data = ss_cols_data(q.client.ss_station, q.client.ss_col)
+    lines = [ui.mark(type='line', x='=Date', y=f'={column}', x_scale='time', color=color_palette[column], label=column.replace("_", "."), size="100%") for column in ss_data.fields[3:]]
     ss_aqi_plot = ui.plot_card(
             box = 'ss_body', 
             title = 'Distribution Plot', 
-            data = data(
-                    fields = tb.columns.tolist(), 
-                    rows = tb.values.tolist()),
+            data = ss_data,
             plot = ui.plot(lines))
     return ss_aqi_plot
 
@@ -139,15 +208,24 @@ def station_bar_menu(q):
     return station_bar
 
 
+def aqi_data(stations):
+    """AQI plot data for the selected stations, built once per selection"""
+    def build():
+        from utils.compact import to_rows
+        from utils.downsample import downsample_frame
+        tb = select_stations(stations, ['Date', 'AQI'])
+        tb.reset_index(inplace=True)
+        tb = downsample_frame(tb, 'Date', ['AQI'], group_column='StationId')
+        return data(
+                fields = tb.columns.tolist(), 
+                rows = to_rows(tb))
+    return _cached_plot_data(('aqi', tuple(stations)), build)
+
 def plot_aqi(q):
-    tb = df.loc[('TN', list(q.client.station)), ['Date', 'AQI']]
-    tb.reset_index(inplace=True)
     aqi_plot = ui.plot_card(
             box = 'body', 
             title = 'AQI Plot', 
-            data = data(
-                    fields = tb.columns.tolist(), 
-                    rows = tb.values.tolist()),
+            data = aqi_data(q.client.station),
             plot = ui.plot([ui.mark(type='path', x='=Date', y='=AQI', x_scale='time', color='=StationId', size="100%")]))
     return aqi_plot
 
@@ -1,42 +1,29 @@
-import pandas as pd
 from h2o_wave import ui, data
 from components.theme import colors, icons
+from utils.risk import get_risk_category, get_aqi_message, risk_mapping
 
-def get_risk_category(hri_value):
-    # Updated thresholds to directly align with AQI categories, based on reference_aqi at 75th percentile (32.32735)
-    if hri_value < 1.55:  # Corresponds exactly to Good AQI (0-50)
-        return "Low"
-    elif hri_value < 3.09:  # Corresponds exactly to Moderate AQI (51-100)
-        return "Moderate"
-    elif hri_value < 4.64:  # Corresponds exactly to Unhealthy for Sensitive Groups AQI (101-150)
-        return "High"
-    else:  # Corresponds to Unhealthy or worse AQI (>150)
-        return "Very High"
+# Cards that depend on the selected date; the other cards only depend on the location
+date_cards = ('forecast_dropdown', 'aqi_stats', 'hri_stats')
 
-risk_mapping = {
-    "Low": {
-        "risk": "Low health risk.",
-        "message": "Air quality is good. Continue with normal outdoor activities but follow general health guidelines."
-    },
-    "Moderate": {
-        "risk": "Moderate health risk.",
-        "message": "Individuals with respiratory or heart conditions should be cautious. Consider limiting prolonged outdoor activities."
-    },
-    "High": {
-        "risk": "High health risk.",
-        "message": "There is a high risk of respiratory and cardiovascular issues such as asthma and heart disease. Preventive measures include: purchasing high quality masks and air purifiers, and covering your face while going outside."
-    },
-    "Very High": {
-        "risk": "Severe health risk.",
-        "message": "Air quality is very poor! Everyone should take precautions. Avoid going outside, use high-quality masks, and consider air purifiers indoors."
-    }
-}
+def data_version():
+    """Version of the forecast data snapshot, or None if the data cannot be loaded"""
+    from utils import forecast_store
+    try:
+        return forecast_store.get_snapshot().version
+    except Exception:
+        return None
+
+def _plot_rows(index, rows_slice, column):
+    """[Date, value, Location] rows of one location's block, for the plot data"""
+    return [list(row) for row in zip(index.date_strings(rows_slice),
+                                     index.columns[column][rows_slice].tolist(),
+                                     index.location_names(rows_slice))]
 
 def forecast_page(q):
-    # Load both forecast CSV files from the data folder
+    # Read the parsed forecast data from the shared store (imported here to keep pandas out of app startup)
+    from utils import forecast_store
     try:
-        aqi_df = pd.read_csv('./data/combined_AQI_forecast.csv')
-        hri_df = pd.read_csv('./data/combined_HRI_forecast.csv')
+        snapshot = forecast_store.get_snapshot()
     except Exception as e:
         return {
             'forecast_md': ui.markdown_card(
@@ -45,39 +32,10 @@ def forecast_page(q):
                 content=f'Error loading forecast data: {e}'
             )
         }
+    forecast = snapshot.forecast
 
-    # Process AQI data
-    if 'Date' not in aqi_df.columns:
-        return {
-            'forecast_md': ui.markdown_card(
-                box='forecast_md',
-                title='Forecasted AQI and HRI',
-                content='AQI CSV file does not contain a Date column.'
-            )
-        }
-    aqi_df['Date'] = pd.to_datetime(aqi_df['Date'])
-    aqi_df.sort_values(by='Date', inplace=True)
-
-    # Process HRI data
-    if 'Date' not in hri_df.columns:
-        return {
-            'forecast_md': ui.markdown_card(
-                box='forecast_md',
-                title='Forecasted AQI and HRI',
-                content='HRI CSV file does not contain a Date column.'
-            )
-        }
-    hri_df['Date'] = pd.to_datetime(hri_df['Date'])
-    hri_df.sort_values(by='Date', inplace=True)
-
-    # Ensure there is a Location column in both dataframes
-    if 'Location' not in aqi_df.columns:
-        aqi_df['Location'] = 'Unknown'
-    if 'Location' not in hri_df.columns:
-        hri_df['Location'] = 'Unknown'
-
-    # Get unique locations from both CSVs and sort them alphabetically
-    locations = sorted(set(aqi_df['Location'].unique()) | set(hri_df['Location'].unique()))
+    # Unique locations of the forecast table, sorted alphabetically
+    locations = snapshot.locations
 
     # Safely get query args: if q.args is None, use an empty dict
     args = q.args or {}
@@ -86,14 +44,12 @@ def forecast_page(q):
     else:
         selected_location = locations[0] if locations else 'Unknown'
 
-    # Filter AQI and HRI data for the selected location
-    aqi_location_data = aqi_df[aqi_df['Location'] == selected_location].copy()
-    hri_location_data = hri_df[hri_df['Location'] == selected_location].copy()
+    # Rows of the selected location (each location is one contiguous, date-sorted block)
+    rows_slice = forecast.location_slice(selected_location)
     
     # Create a list of dates for the dropdown
-    # Format dates to be more readable
-    hri_location_data['Formatted_Date'] = hri_location_data['Date'].dt.strftime('%Y-%m-%d')
-    dates = hri_location_data['Formatted_Date'].tolist()
+    # Dates as YYYY-MM-DD, formatted for this block only
+    dates = forecast.date_strings(rows_slice)
     date_choices = [ui.choice(date, date) for date in dates]
     
     # Get selected date from query args, or use the first date if not selected
@@ -102,42 +58,33 @@ def forecast_page(q):
     else:
         selected_date = dates[0] if dates else None
 
+    # Row of the selected date and location, holding both its AQI and HRI forecast
+    selected_row = forecast.row(selected_location, selected_date) if selected_date else None
+
     # Get HRI value for the selected date and location
-    if selected_date:
-        selected_date_data = hri_location_data[hri_location_data['Formatted_Date'] == selected_date]
-        if not selected_date_data.empty:
-            specific_hri = selected_date_data['HRI'].values[0]
-        else:
-            specific_hri = 0
-    else:
-        specific_hri = 0
+    specific_hri = 0
+    if selected_row is not None:
+        specific_hri = forecast.columns['HRI'][selected_row]
     
     # Get risk category and mapping
     risk_category = get_risk_category(specific_hri)
     risk_info = risk_mapping[risk_category]
     
-    # Format dates in AQI data for matching with selected date
-    aqi_location_data['Formatted_Date'] = aqi_location_data['Date'].dt.strftime('%Y-%m-%d')
-    
     # Get AQI value for the selected date and location
     specific_aqi = 0
-    if selected_date:
-        aqi_date_data = aqi_location_data[aqi_location_data['Formatted_Date'] == selected_date]
-        if not aqi_date_data.empty:
-            specific_aqi = round(aqi_date_data['AQI_Forecast'].values[0], 2)
+    if selected_row is not None:
+        specific_aqi = round(forecast.columns['AQI_Forecast'][selected_row], 2)
     
     # Create a stats section with key metrics
     # For example: average AQI for the forecast period
-    aqi_data = aqi_df[aqi_df['Location'] == selected_location]
-    hri_data = hri_df[hri_df['Location'] == selected_location]
+    location_data = snapshot.df.iloc[rows_slice]
     
     # For display in information card
-    avg_aqi = round(aqi_data['AQI_Forecast'].mean(), 2) if not aqi_data.empty else 0
-    avg_hri = round(hri_data['HRI'].mean(), 6) if not hri_data.empty else 0
+    avg_aqi = round(location_data['AQI_Forecast'].mean(), 2) if not location_data.empty else 0
+    avg_hri = round(location_data['HRI'].mean(), 6) if not location_data.empty else 0
     
-    # Get latest available dates for each dataset
-    latest_aqi_date = aqi_data['Date'].max().strftime('%Y-%m-%d') if not aqi_data.empty else "N/A"
-    latest_hri_date = hri_data['Date'].max().strftime('%Y-%m-%d') if not hri_data.empty else "N/A"
+    # Get the latest available date (the last row of a date-sorted block); AQI and HRI share the rows
+    latest_date = forecast.date_strings(rows_slice.stop - 1) if not location_data.empty else "N/A"
     
     # Determine AQI category and color for the specific date
     aqi_category = "Good"
@@ -241,26 +188,18 @@ def forecast_page(q):
 - **Health Risk Index (HRI)**: Indicates potential health risks based on air quality (Low to Very High)
 
 **Average Values**: AQI: {avg_aqi} | HRI: {avg_hri}
-**Latest Data Updated**: AQI: {latest_aqi_date} | HRI: {latest_hri_date}
+**Latest Data Updated**: AQI: {latest_date} | HRI: {latest_date}
         """,
     )
 
-    # Filter the dataframes for the selected location
-    aqi_df_filtered = aqi_df[aqi_df['Location'] == selected_location].copy()
-    hri_df_filtered = hri_df[hri_df['Location'] == selected_location].copy()
-
-    # Format the Date for the plots
-    aqi_df_filtered['Date_str'] = aqi_df_filtered['Date'].dt.strftime('%Y-%m-%d')
-    hri_df_filtered['Date_str'] = hri_df_filtered['Date'].dt.strftime('%Y-%m-%d')
-
     # Prepare AQI plot data
     aqi_fields = ['Date', 'AQI_Forecast', 'Location']
-    aqi_rows = aqi_df_filtered[['Date_str', 'AQI_Forecast', 'Location']].values.tolist()
+    aqi_rows = _plot_rows(forecast, rows_slice, 'AQI_Forecast')
     aqi_plot_data = data(fields=aqi_fields, rows=aqi_rows)
 
     # Prepare HRI plot data
     hri_fields = ['Date', 'HRI', 'Location']
-    hri_rows = hri_df_filtered[['Date_str', 'HRI', 'Location']].values.tolist()
+    hri_rows = _plot_rows(forecast, rows_slice, 'HRI')
     hri_plot_data = data(fields=hri_fields, rows=hri_rows)
 
     # Create a plot card for the selected location's forecasted AQI
@@ -305,14 +244,3 @@ def forecast_page(q):
         'aqi_forecast': aqi_plot,
         'hri_forecast': hri_plot,
     }
-    
-def get_aqi_message(category):
-    messages = {
-        "Good": "Air quality is satisfactory, and air pollution poses little or no risk.",
-        "Moderate": "Air quality is acceptable. However, there may be a risk for some people, particularly those who are unusually sensitive to air pollution.",
-        "Unhealthy for Sensitive Groups": "Members of sensitive groups may experience health effects. The general public is less likely to be affected.",
-        "Unhealthy": "Some members of the general public may experience health effects; members of sensitive groups may experience more serious health effects.",
-        "Very Unhealthy": "Health alert: The risk of health effects is increased for everyone.",
-        "Hazardous": "Health warning of emergency conditions: everyone is more likely to be affected."
-    }
-    return messages.get(category, "No information available for this category.")
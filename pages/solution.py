@@ -1,23 +1,28 @@
-import pandas as pd
+import functools
 import datetime as dt
 from h2o_wave import ui
-from utils.load_data import load_data
 
-df = load_data('train.csv')
+@functools.lru_cache(maxsize=None)
+def get_date_df():
+    """Data collection period of each state, computed on first use instead of at import time"""
+    import pandas as pd
+    from utils.load_data import load_data
 
-# Look at since when the data was collected for each state. Also, till when was the data collected.
-grouped = df.groupby(by=["StateCode"])
+    df = load_data('train.csv')
 
-start_dates = grouped.Date.min()
-end_dates = grouped.Date.max()
+    # Look at since when the data was collected for each state. Also, till when was the data collected.
+    grouped = df.groupby(by=["StateCode"])
 
-date_df = pd.DataFrame(list(zip(start_dates.values, end_dates.values)), index=start_dates.index.values, columns=["StartDate", "EndDate"]).sort_values("StartDate")
+    start_dates = grouped.Date.min()
+    end_dates = grouped.Date.max()
 
-date_df.StartDate = date_df.StartDate.apply(lambda x: x.date())
-date_df.EndDate = date_df.EndDate.apply(lambda x: x.date())
+    date_df = pd.DataFrame(list(zip(start_dates.values, end_dates.values)), index=start_dates.index.values, columns=["StartDate", "EndDate"]).sort_values("StartDate")
 
-date_df['Difference'] = date_df.EndDate - date_df.StartDate
+    date_df.StartDate = date_df.StartDate.apply(lambda x: x.date())
+    date_df.EndDate = date_df.EndDate.apply(lambda x: x.date())
 
+    date_df['Difference'] = date_df.EndDate - date_df.StartDate
+    return date_df
 
 '''content_md = f"""=
 ## Table of Contents
@@ -40,78 +40,26 @@ else:
 async def main():
     try:
         # Import the bot asynchronously
-        from telegram import Update
-        from telegram.ext import Application, CommandHandler, MessageHandler, filters
-        
-        # Import handlers - use local imports to avoid circular imports
-        logger.info("Importing handlers...")
-        
-        # Define handlers directly here for simplicity
-        async def start(update: Update, context):
-            logger.info(f"Start command received from user {update.effective_user.id}")
-            await update.message.reply_text(
-                "Welcome to VitalAir Forecast Bot! 👋\n\n"
-                "I can provide you with Air Quality Index (AQI) and Health Risk Index (HRI) forecasts for various locations in Tamil Nadu.\n\n"
-                "To get a forecast, send a message in this format:\n"
-                "<Location> <DD-MM-YYYY>\n\n"
-                "For example: 'Alandur 31-12-2024'"
-            )
-
-        async def help_command(update: Update, context):
-            logger.info(f"Help command received from user {update.effective_user.id}")
-            await update.message.reply_text(
-                "VitalAir Bot Help 🆘\n\n"
-                "To get an air quality and health risk forecast, send a message in this format:\n"
-                "<Location> <DD-MM-YYYY>\n\n"
-                "For example: 'Alandur 31-12-2024'\n\n"
-                "Available locations include: Alandur, Vellore, Velachery, Tirupur, Salem, Royapuram, "
-                "Ramanathapuram, Perungudi, Manali, Ooty, Kodungaiyur, and Crescent_chengalpattu."
-            )
-
-        async def message_handler(update: Update, context):
-            logger.info(f"Message received from user {update.effective_user.id}: {update.message.text}")
-            
-            # Import the query handler
-            from telegram_bot import handle_location_date_query
-            
-            # Process the message
-            message_text = update.message.text
-            response = handle_location_date_query(message_text)
-            
-            logger.info(f"Sending response: {response[:100]}...")
-            await update.message.reply_text(response)
+        from telegram_bot import build_application, serve, BOT_MODE, METRICS_PORT
+        from utils import forecast_store, metrics
         
         logger.info("Starting VitalAir Telegram Bot...")
         
-        # Create the application
-        application = Application.builder().token(TELEGRAM_TOKEN).build()
-        
-        # Add handlers
-        application.add_handler(CommandHandler("start", start))
-        application.add_handler(CommandHandler("help", help_command))
-        application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, message_handler))
-        
-        # Start the bot
-        logger.info("Starting polling...")
-        await application.initialize()
-        await application.start()
-        await application.updater.start_polling(allowed_updates=["message"])
+        # Parse the forecast data before the first message arrives
+        forecast_store.warm_up()
+        metrics.start(port=METRICS_PORT)
         
-        logger.info("Bot is running! Press Ctrl+C to stop")
+        # Create the application with the handlers shared with telegram_bot.py
+        application = build_application(TELEGRAM_TOKEN)
         
-        # Keep the bot running until interrupted
+        # Receive updates by polling or webhook (VITALAIR_BOT_MODE) until interrupted
+        logger.info(f"Starting the bot in {BOT_MODE} mode. Press Ctrl+C to stop")
         try:
-            # Run forever
-            while True:
-                await asyncio.sleep(3600)  # Sleep for an hour
-                logger.info("Bot is still running...")
+            await serve(application)
         except asyncio.CancelledError:
-            logger.info("Bot polling was cancelled")
+            logger.info("Bot was cancelled")
         finally:
-            # Stop the bot gracefully
-            logger.info("Stopping the bot...")
-            await application.stop()
-            await application.shutdown()
+            logger.info("Bot has stopped")
     
     except Exception as e:
         logger.exception(f"Error in bot main function: {e}")
@@ -25,6 +25,14 @@ echo "Current directory: $(pwd)"
 echo "Files in directory:"
 ls -la
 
+# Write the binary copies of the data files for faster loading
+echo "Converting data files..."
+python -m utils.load_data
+
+# Publish the datasets once for every process (web workers and the bot) to map instead of parsing
+echo "Publishing shared data..."
+python -m utils.shared_data
+
 # Use direct python runner instead of wave CLI
 echo "Starting Python Wave runner..."
 python run_railway.py 
\ No newline at end of file
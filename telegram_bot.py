@@ -1,10 +1,15 @@
 import os
 import re
-import pandas as pd
+import math
+import time
+import signal
+import contextlib
 from datetime import datetime
 import logging
 import asyncio
 import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from dotenv import load_dotenv
 
 # Set up logging
@@ -14,12 +19,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Path to the forecast data files
-AQI_FORECAST_PATH = './data/combined_AQI_forecast.csv'
-HRI_FORECAST_PATH = './data/combined_HRI_forecast.csv'
+# Shared, hot-reloaded forecast data (also used by the web app)
+from utils import forecast_store
 
-# Import the get_risk_category and get_aqi_message functions from forecast.py
-from pages.forecast import get_risk_category, get_aqi_message
+# Risk and AQI helpers shared with the forecast page (kept free of UI imports)
+from utils.risk import get_risk_category, get_aqi_message
+from utils import metrics
+from utils import alerts
+from utils.cache import LRUCache
+from utils.ratelimit import TokenBucketLimiter
 
 # Bot state tracking
 is_running = False
@@ -32,20 +40,51 @@ load_dotenv()
 # Get token from environment variables
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "8033530606:AAGoKcAtDU_08oucMjU4NBaO6C80YWoSoCI")
 
+# Threads answering queries off the event loop
+QUERY_WORKERS = int(os.getenv("VITALAIR_BOT_WORKERS", "4"))
+# Updates processed at the same time by the Application
+CONCURRENT_UPDATES = int(os.getenv("VITALAIR_BOT_CONCURRENT_UPDATES", "64"))
+# Updates received and not yet answered (waiting for one of the CONCURRENT_UPDATES slots or a worker)
+# before new ones get a "busy" reply
+MAX_QUEUE = int(os.getenv("VITALAIR_BOT_MAX_QUEUE", "256"))
+# Per-user token bucket: queries per second, and how many can be sent in a burst
+USER_RATE = float(os.getenv("VITALAIR_BOT_USER_RATE", "1"))
+USER_BURST = int(os.getenv("VITALAIR_BOT_USER_BURST", "5"))
+
+BUSY_REPLY = "⏳ The bot is busy right now. Please try again in a few seconds."
+RATE_LIMITED_REPLY = "⏳ You're sending messages too quickly. Please wait a few seconds and try again."
+# Serve the bot metrics on this port (unset: only the periodic log line)
+METRICS_PORT = os.getenv("VITALAIR_BOT_METRICS_PORT")
+
+# Send the daily subscription alerts from the bot process
+ALERTS_ENABLED = os.getenv("VITALAIR_ALERTS", "1").lower() not in ('0', 'false', 'no', 'off')
+
+# 'polling' or 'webhook'
+BOT_MODE = os.getenv("VITALAIR_BOT_MODE", "polling")
+# Bot API endpoint, e.g. a local stand-in server for load tests
+BOT_API_URL = os.getenv("VITALAIR_BOT_API_URL", "https://api.telegram.org")
+# Public base URL Telegram posts updates to in webhook mode, e.g. https://vitalair-bot.up.railway.app
+WEBHOOK_URL = os.getenv("VITALAIR_WEBHOOK_URL")
+WEBHOOK_PATH = os.getenv("VITALAIR_WEBHOOK_PATH", "/telegram")
+WEBHOOK_PORT = int(os.getenv("VITALAIR_WEBHOOK_PORT", os.getenv("PORT", "8443")))
+# Checked against the X-Telegram-Bot-Api-Secret-Token header of every webhook request
+WEBHOOK_SECRET = os.getenv("VITALAIR_WEBHOOK_SECRET")
+
+# Formatted answers by (location, date), including "not found" answers; flushed when the forecast data changes
+response_cache = LRUCache(
+    int(os.getenv("VITALAIR_BOT_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("VITALAIR_BOT_CACHE_TTL", "300")) or None,
+)
+_response_cache_version = None
+metrics.registry.register_collector('vitalair_bot_response_cache', response_cache.stats)
+
 def load_forecast_data():
-    """Load both AQI and HRI forecast datasets"""
+    """Return the forecast table (AQI and HRI per location and date) from the shared forecast store"""
     try:
-        aqi_df = pd.read_csv(AQI_FORECAST_PATH)
-        hri_df = pd.read_csv(HRI_FORECAST_PATH)
-        
-        # Convert Date column to datetime
-        aqi_df['Date'] = pd.to_datetime(aqi_df['Date'])
-        hri_df['Date'] = pd.to_datetime(hri_df['Date'])
-        
-        return aqi_df, hri_df
+        return forecast_store.get_snapshot().df
     except Exception as e:
         logger.error(f"Error loading forecast data: {e}")
-        return None, None
+        return None
 
 def parse_message(message_text):
     """
@@ -73,37 +112,66 @@ def parse_message(message_text):
         logger.error(f"Invalid date format: {date_str}")
         return location, None
 
-def get_forecast_data(location, date_str, aqi_df, hri_df):
+# "<Location|all> <DD-MM-YYYY>..<DD-MM-YYYY>" or "<Location|all> week"
+RANGE_PATTERN = re.compile(r"^(\w+)\s+(?:(\d{2}-\d{2}-\d{4})\s*\.\.\s*(\d{2}-\d{2}-\d{4})|(week))$", re.IGNORECASE)
+WEEK = "week"
+
+def parse_range_message(message_text):
+    """
+    Parse a message in the format "<Location> <DD-MM-YYYY>..<DD-MM-YYYY>" or "<Location> week"
+    Returns (location, start_date, end_date) with YYYY-MM-DD dates, WEEK for both dates of a week query,
+    (location, None, None) for invalid dates or (None, None, None) if invalid format
+    """
+    match = RANGE_PATTERN.match(message_text.strip())
+    if not match:
+        return None, None, None
+    
+    location, start_text, end_text, week = match.groups()
+    if week:
+        return location, WEEK, WEEK
+    try:
+        start_date = datetime.strptime(start_text, "%d-%m-%Y").strftime("%Y-%m-%d")
+        end_date = datetime.strptime(end_text, "%d-%m-%Y").strftime("%Y-%m-%d")
+        return location, start_date, end_date
+    except ValueError:
+        logger.error(f"Invalid date range: {start_text}..{end_text}")
+        return location, None, None
+
+def get_aqi_category(aqi_value):
+    """AQI category name for an AQI value"""
+    if aqi_value > 300:
+        return "Hazardous"
+    elif aqi_value > 200:
+        return "Very Unhealthy"
+    elif aqi_value > 150:
+        return "Unhealthy"
+    elif aqi_value > 100:
+        return "Unhealthy for Sensitive Groups"
+    elif aqi_value > 50:
+        return "Moderate"
+    return "Good"
+
+def get_forecast_data(location, date_str, snapshot):
     """
     Get AQI and HRI forecast data for a specific location and date
     Returns a tuple of (aqi_value, aqi_category, hri_value, risk_category)
     """
-    if aqi_df is None or hri_df is None:
+    if snapshot is None:
         return None, None, None, None
     
-    # Filter for the requested location and date
-    aqi_data = aqi_df[(aqi_df['Location'] == location) & (aqi_df['Date'] == date_str)]
-    hri_data = hri_df[(hri_df['Location'] == location) & (hri_df['Date'] == date_str)]
-    
-    if aqi_data.empty or hri_data.empty:
+    # One point lookup in the joined (location, date) table
+    row = snapshot.forecast.row(location, date_str)
+    if row is None:
         return None, None, None, None
+    aqi_value = snapshot.forecast.columns['AQI_Forecast'][row]
+    hri_value = snapshot.forecast.columns['HRI'][row]
     
-    # Extract values
-    aqi_value = round(aqi_data['AQI_Forecast'].values[0], 2)
-    hri_value = round(hri_data['HRI'].values[0], 4)
+    # Round the values
+    aqi_value = round(aqi_value, 2)
+    hri_value = round(hri_value, 4)
     
     # Determine AQI category
-    aqi_category = "Good"
-    if aqi_value > 300:
-        aqi_category = "Hazardous"
-    elif aqi_value > 200:
-        aqi_category = "Very Unhealthy"
-    elif aqi_value > 150:
-        aqi_category = "Unhealthy"
-    elif aqi_value > 100:
-        aqi_category = "Unhealthy for Sensitive Groups"
-    elif aqi_value > 50:
-        aqi_category = "Moderate"
+    aqi_category = get_aqi_category(aqi_value)
     
     # Determine HRI risk category
     risk_category = get_risk_category(hri_value)
@@ -139,43 +207,307 @@ def format_response(location, date_str, aqi_value, aqi_category, hri_value, risk
     
     return response
 
+# Telegram rejects messages longer than this
+MAX_MESSAGE_LENGTH = 4096
+# Rows listed in one range/all reply (a few messages); the rest are counted, with a hint to narrow the range
+MAX_TABLE_ROWS = 200
+
+def forecast_table(snapshot, location, start_date, end_date):
+    """
+    (location, date_str, aqi_value, hri_value) rows between two YYYY-MM-DD dates, for one location or 'all'.
+    Rows are selected with one slice (a location) or one date mask (all locations) of the joined table.
+    """
+    forecast = snapshot.forecast
+    if location == 'all':
+        rows = forecast.date_rows(start_date, end_date)
+    else:
+        rows = forecast.range_slice(location, start_date, end_date)
+    return [(row_location, date_str, round(aqi_value, 2), round(hri_value, 4))
+            for row_location, date_str, aqi_value, hri_value in zip(
+                forecast.location_names(rows), forecast.date_strings(rows),
+                forecast.columns['AQI_Forecast'][rows].tolist(), forecast.columns['HRI'][rows].tolist())]
+
+def format_table(title, rows, show_location, show_date):
+    """Format range/all rows as one line each (at most MAX_TABLE_ROWS), listed under a title"""
+    if not rows:
+        return None
+    lines = [title, ""]
+    for location, date_str, aqi_value, hri_value in rows[:MAX_TABLE_ROWS]:
+        display_date = datetime.strptime(date_str, "%Y-%m-%d").strftime("%d-%m-%Y")
+        label = " · ".join(
+            ([display_date] if show_date else []) + ([location.replace("_", "\\_")] if show_location else [])
+        )
+        lines.append(f"{label}: AQI {aqi_value} ({get_aqi_category(aqi_value)}) · "
+                     f"HRI {hri_value} ({get_risk_category(hri_value)})")
+    if len(rows) > MAX_TABLE_ROWS:
+        lines.append(f"\n... {len(rows) - MAX_TABLE_ROWS} more rows. Narrow the date range to see them.")
+    return "\n".join(lines)
+
+def split_message(text, limit=MAX_MESSAGE_LENGTH):
+    """Split a reply into chunks of at most limit characters, at line breaks where possible"""
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit + 1)
+        if cut <= 0:
+            cut = limit
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip("\n")
+    chunks.append(text)
+    return chunks
+
 def handle_location_date_query(message_text):
     """
     Main function to handle a location-date query message
     Returns a formatted response with forecast data
     """
-    # Load forecast data
-    aqi_df, hri_df = load_forecast_data()
-    if aqi_df is None or hri_df is None:
+    global _response_cache_version
+
+    # Get the current forecast data snapshot
+    try:
+        snapshot = forecast_store.get_snapshot()
+    except Exception as e:
+        logger.error(f"Error loading forecast data: {e}")
         return "Sorry, forecast data is currently unavailable. Please try again later."
     
-    # Parse the message
+    # Parse the message: one date, or a date range / week
     location, date_str = parse_message(message_text)
+    start_date = end_date = None
     if location is None:
-        return "Please use the format: <Location> <DD-MM-YYYY>\nFor example: 'Alandur 31-12-2024'"
-    
-    if date_str is None:
+        location, start_date, end_date = parse_range_message(message_text)
+        if location is None:
+            return ("Please use the format: <Location> <DD-MM-YYYY>\nFor example: 'Alandur 31-12-2024'\n\n"
+                    "Also: 'Alandur 01-01-2025..07-01-2025', 'Alandur week' or 'all 31-12-2024'")
+        if start_date is None:
+            return "Invalid date range. Please use DD-MM-YYYY..DD-MM-YYYY, e.g., '01-01-2025..07-01-2025'"
+    elif date_str is None:
         return "Invalid date format. Please use DD-MM-YYYY format, e.g., '31-12-2024'"
     
-    # Check if location exists in our data
-    if location not in set(aqi_df['Location'].unique()) | set(hri_df['Location'].unique()):
-        available_locations = sorted(set(aqi_df['Location'].unique()) | set(hri_df['Location'].unique()))
-        return f"Location '{location}' not found. Available locations: {', '.join(available_locations)}"
+    # Cached answers are only valid for the forecast data they were computed from
+    if _response_cache_version != snapshot.version:
+        response_cache.clear()
+        _response_cache_version = snapshot.version
+    # Keyed on the resolved location, so 'alandur' and 'ALANDUR' share Alandur's answer (and typos, their case)
+    resolved = _resolve_location(snapshot, location)
+    if resolved is not None:
+        location = resolved
+    key_location = resolved or location.casefold()
+    if start_date is None and location != 'all':
+        key = (snapshot.version, key_location, date_str)
+        return response_cache.get_or_create(key, lambda: _answer(snapshot, location, date_str))
+    if start_date is None:
+        start_date = end_date = date_str
+    elif start_date == WEEK and resolved is not None:
+        # Keyed on the week's dates, which move with today
+        start_date, end_date = _week(snapshot, location)
+        if start_date is None:
+            return f"Sorry, no forecast data available for {location}."
+    key = (snapshot.version, key_location, start_date, end_date)
+    return response_cache.get_or_create(key, lambda: _answer_range(snapshot, location, start_date, end_date))
+
+def _resolve_location(snapshot, location):
+    """'all', the forecast's name of a location (accepting other spellings) or None if it is unknown"""
+    if location.lower() == 'all':
+        return 'all'
+    if location in snapshot.locations:
+        return location
+    return snapshot.location_index.resolve(location)
+
+def _answer(snapshot, location, date_str):
+    # Check if location exists in our data, accepting other spellings ('Salem', 'chengalpattu')
+    if location not in snapshot.locations:
+        canonical = snapshot.location_index.resolve(location)
+        if canonical is None:
+            suggestions = snapshot.location_index.fuzzy(location, 3)
+            if suggestions:
+                return f"Location '{location}' not found. Did you mean: {', '.join(suggestions)}?"
+            return f"Location '{location}' not found. Available locations: {', '.join(snapshot.locations)}"
+        location = canonical
     
     # Get the forecast data
     aqi_value, aqi_category, hri_value, risk_category = get_forecast_data(
-        location, date_str, aqi_df, hri_df
+        location, date_str, snapshot
     )
     
     # Format and return the response
     return format_response(location, date_str, aqi_value, aqi_category, hri_value, risk_category)
 
+def _week(snapshot, location):
+    """
+    First and last date of a week query of location ('all' for every location): the 7 days from today, or
+    the last 7 days of the forecast period once today is past it. (None, None) without forecast data.
+    """
+    location = None if location == 'all' else location
+    first, last = _period(snapshot, location)
+    if first is None:
+        return None, None
+    start = min(np.datetime64(_default_date(snapshot, location), 'D'), np.datetime64(last, 'D') - 6)
+    start = max(start, np.datetime64(first, 'D'))
+    return str(start), str(start + 6)
+
+def _answer_range(snapshot, location, start_date, end_date):
+    if location.lower() == 'all':
+        location = 'all'
+    elif location not in snapshot.locations:
+        canonical = snapshot.location_index.resolve(location)
+        if canonical is None:
+            return _answer(snapshot, location, start_date)
+        location = canonical
+    
+    if end_date < start_date:
+        return "The end of the date range is before its start."
+    
+    display_start = datetime.strptime(start_date, "%Y-%m-%d").strftime("%d-%m-%Y")
+    display_end = datetime.strptime(end_date, "%Y-%m-%d").strftime("%d-%m-%Y")
+    period = display_start if start_date == end_date else f"{display_start} to {display_end}"
+    if location == 'all':
+        title = f"📊 AQI & HRI Forecast for all locations 📊\n📅 {period}"
+    else:
+        location_escaped = location.replace("_", "\\_")
+        title = f"📊 AQI & HRI Forecast 📊\n📍 {location_escaped}\n📅 {period}"
+    
+    # Rows come sorted by (location, date); all locations over several days read best day by day
+    rows = forecast_table(snapshot, location, start_date, end_date)
+    if location == 'all' and start_date != end_date:
+        rows.sort(key=lambda row: (row[1], row[0]))
+    response = format_table(title, rows, show_location=location == 'all', show_date=start_date != end_date)
+    if response is None:
+        return f"Sorry, no forecast data available for {location} in {period}."
+    return response
+
+# Inline mode: "@bot <location prefix> [DD-MM-YYYY]" in any chat
+INLINE_RESULTS = 10
+INLINE_QUERY = re.compile(r"^(.*?)\s*(\d{2}-\d{2}-\d{4})?\s*$")
+
+def _period(snapshot, location=None):
+    """First and last forecast date of location (of all locations if None), or (None, None)"""
+    if location is None:
+        return snapshot.forecast.period()
+    return snapshot.forecast.period(snapshot.forecast.location_slice(location))
+
+def _default_date(snapshot, location=None):
+    """Today, clamped to the forecast period of location (of all locations if None)"""
+    first, last = _period(snapshot, location)
+    if first is None:
+        return None
+    return min(max(datetime.now().strftime("%Y-%m-%d"), first), last)
+
+def inline_results(query_text, limit=INLINE_RESULTS):
+    """
+    Suggestions for an inline query.
+    Returns a list of (location, date_str, title, description, response) tuples.
+    """
+    snapshot = forecast_store.get_snapshot()
+    prefix, date_text = INLINE_QUERY.match(query_text).groups()
+    date_str = None
+    if date_text:
+        try:
+            date_str = datetime.strptime(date_text, "%d-%m-%Y").strftime("%Y-%m-%d")
+        except ValueError:
+            return []
+
+    results = []
+    for location in snapshot.location_index.suggest(prefix, limit):
+        day = date_str or _default_date(snapshot, location)
+        if day is None:
+            continue
+        display_date = datetime.strptime(day, "%Y-%m-%d").strftime("%d-%m-%Y")
+        aqi_value, aqi_category, hri_value, risk_category = get_forecast_data(location, day, snapshot)
+        if aqi_value is None:
+            description = "No forecast for this date"
+        else:
+            description = f"AQI {aqi_value} ({aqi_category}) · HRI {hri_value} ({risk_category})"
+        response = handle_location_date_query(f"{location} {display_date}")
+        results.append((location, day, f"{location} · {display_date}", description, response))
+    return results
+
+# Worker pool for handle_location_date_query, so a slow query never blocks the event loop
+_executor = None
+_executor_lock = threading.Lock()
+_pending = 0
+_pending_lock = threading.Lock()
+
+def get_executor():
+    """Return the shared query worker pool, creating it on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=QUERY_WORKERS, thread_name_prefix='vitalair-query')
+        return _executor
+
+def shutdown_executor():
+    """Stop the query worker pool once the queued queries are answered"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+user_limiter = TokenBucketLimiter(USER_RATE, USER_BURST)
+
+def _add_pending(delta):
+    global _pending
+    with _pending_lock:
+        _pending += delta
+        metrics.registry.set_gauge('vitalair_bot_queue_depth', _pending)
+
+async def run_query(message_text):
+    """
+    Answer a query on the worker pool.
+    Records the queue depth, the time spent waiting for a worker and the query time.
+    """
+    submitted = time.perf_counter()
+    _add_pending(1)
+
+    def work():
+        _add_pending(-1)
+        metrics.registry.observe('vitalair_bot_queue_wait_seconds', time.perf_counter() - submitted)
+        with metrics.timer('vitalair_bot_query_seconds'):
+            return handle_location_date_query(message_text)
+
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), work)
+
 # The Telegram bot implementation using python-telegram-bot library
-from telegram import Update
-from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
+from telegram import Update, InlineQueryResultArticle, InputTextMessageContent
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+from telegram.ext import (Application, ApplicationHandlerStop, CommandHandler, InlineQueryHandler, MessageHandler,
+                          TypeHandler, filters, ContextTypes)
+
+class UpdateQueue(asyncio.Queue):
+    """
+    The Application's update queue, counting the updates received and not yet processed.
+    The Application takes each update off the queue at once and waits for a free slot in a task of its own,
+    so qsize() stays near 0 however many are waiting; `backlog` counts until the update's task_done().
+    The ids of the updates that arrived with max_backlog others outstanding are kept in `overflow`.
+    """
+
+    def __init__(self, max_backlog=MAX_QUEUE):
+        super().__init__()
+        self.max_backlog = max_backlog
+        self.backlog = 0
+        self.overflow = set()
+
+    def put_nowait(self, item):
+        super().put_nowait(item)
+        if self.backlog >= self.max_backlog and isinstance(item, Update):
+            self.overflow.add(item.update_id)
+        self.backlog += 1
+        metrics.registry.set_gauge('vitalair_bot_backlog', self.backlog)
+
+    def task_done(self):
+        super().task_done()
+        self.backlog -= 1
+        metrics.registry.set_gauge('vitalair_bot_backlog', self.backlog)
+
+    def overflowed(self, update):
+        """Whether update arrived when the queue was full (True once per update)"""
+        if update.update_id not in self.overflow:
+            return False
+        self.overflow.discard(update.update_id)
+        return True
 
 # Command handlers
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    logger.info(f"Start command received from user {update.effective_user.id}")
     await update.message.reply_text(
         "Welcome to VitalAir Forecast Bot! 👋\n\n"
         "I can provide you with Air Quality Index (AQI) and Health Risk Index (HRI) forecasts for various locations in Tamil Nadu.\n\n"
@@ -185,61 +517,346 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     )
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    logger.info(f"Help command received from user {update.effective_user.id}")
     await update.message.reply_text(
         "VitalAir Bot Help 🆘\n\n"
         "To get an air quality and health risk forecast, send a message in this format:\n"
         "<Location> <DD-MM-YYYY>\n\n"
         "For example: 'Alandur 31-12-2024'\n\n"
+        "Several days or locations at once:\n"
+        "'Alandur 01-01-2025..07-01-2025', 'Alandur week' or 'all 31-12-2024'\n\n"
         "Available locations include: Alandur, Vellore, Velachery, Tirupur, Salem, Royapuram, "
-        "Ramanathapuram, Perungudi, Manali, Ooty, Kodungaiyur, and Crescent_chengalpattu."
+        "Ramanathapuram, Perungudi, Manali, Ooty, Kodungaiyur, and Crescent_chengalpattu.\n\n"
+        "Daily alerts: /subscribe <Location> [AQI threshold], /unsubscribe [Location], /subscriptions\n\n"
+        "In any chat, type the bot's @username followed by a location (and optionally a date) to share a forecast."
     )
 
+def shed_reason(user_id, queue_full=False):
+    """
+    Why an update from user_id should not be handled now ('queue_full' or 'user_rate'), or None.
+    An update shed because the queue was full takes no token from the user.
+    """
+    if queue_full:
+        return 'queue_full'
+    if user_id is not None and not user_limiter.allow(user_id):
+        return 'user_rate'
+    return None
+
+async def shed_update(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Runs before every handler: under overload, a cheap reply instead of more work (one reply per run of
+    rate-limited messages; shed inline queries get none) and no further handling.
+    """
+    user_id = update.effective_user.id if update.effective_user else None
+    reason = shed_reason(user_id, context.application.update_queue.overflowed(update))
+    if reason is None:
+        return
+    metrics.registry.inc('vitalair_bot_shed_total', reason=reason)
+    if update.message is not None:
+        if reason == 'queue_full':
+            await update.message.reply_text(BUSY_REPLY)
+        elif user_limiter.denials(user_id) == 1:
+            await update.message.reply_text(RATE_LIMITED_REPLY)
+    raise ApplicationHandlerStop
+
 async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     message_text = update.message.text
-    response = handle_location_date_query(message_text)
-    await update.message.reply_text(response)
+    logger.debug(f"Message received from user {update.effective_user.id}: {message_text}")
+    
+    with metrics.timer('vitalair_bot_response_seconds'):
+        response = await run_query(message_text)
+        for chunk in split_message(response):
+            await update.message.reply_text(chunk)
+
+# ---- Daily alert subscriptions ---- #
+_alert_store = None
+_alert_store_lock = threading.Lock()
+
+def get_alert_store():
+    """Return the shared subscription store, opening it on first use"""
+    global _alert_store
+    with _alert_store_lock:
+        if _alert_store is None:
+            _alert_store = alerts.SubscriptionStore()
+        return _alert_store
+
+async def _in_worker(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), fn, *args)
+
+async def subscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if not context.args or len(context.args) > 2:
+        await update.message.reply_text(
+            "Usage: /subscribe <Location> [AQI threshold]\n"
+            "For example: '/subscribe Alandur' for a daily forecast, or '/subscribe Alandur 100' "
+            "to be alerted only on days with a forecast AQI of 100 or more."
+        )
+        return
+    
+    snapshot = forecast_store.get_snapshot()
+    location = context.args[0]
+    if location not in snapshot.locations:
+        location = snapshot.location_index.resolve(location)
+        if location is None:
+            await update.message.reply_text(_answer(snapshot, context.args[0], None))
+            return
+    
+    threshold = None
+    if len(context.args) == 2:
+        try:
+            threshold = float(context.args[1])
+        except ValueError:
+            threshold = math.nan
+        # nan and inf would never fire, and 0 or less would fire every day like no threshold
+        if not math.isfinite(threshold) or threshold <= 0:
+            await update.message.reply_text("The threshold must be a positive number, e.g. '/subscribe Alandur 100'")
+            return
+    
+    await _in_worker(get_alert_store().subscribe, update.effective_chat.id, location, threshold)
+    when = f"when the forecast AQI is {threshold:g} or more" if threshold is not None else "every day"
+    await update.message.reply_text(
+        f"Subscribed to {location.replace('_', ' ')}: you will get its forecast at {alerts.ALERT_TIME} {when}.\n"
+        "Use /unsubscribe to stop."
+    )
+
+async def unsubscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    location = None
+    if context.args:
+        snapshot = forecast_store.get_snapshot()
+        location = context.args[0]
+        if location not in snapshot.locations:
+            location = snapshot.location_index.resolve(location) or location
+    removed = await _in_worker(get_alert_store().unsubscribe, update.effective_chat.id, location)
+    if not removed:
+        await update.message.reply_text("You have no matching subscriptions.")
+    else:
+        await update.message.reply_text(f"Unsubscribed from {location.replace('_', ' ') if location else 'all locations'}.")
+
+async def subscriptions_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    rows = await _in_worker(get_alert_store().subscriptions, update.effective_chat.id)
+    if not rows:
+        await update.message.reply_text("You have no subscriptions. Use /subscribe <Location> [AQI threshold].")
+        return
+    lines = [f"{location.replace('_', ' ')}" + (f" (AQI ≥ {threshold:g})" if threshold is not None else "")
+             for location, threshold in rows]
+    await update.message.reply_text("Your daily alerts:\n" + "\n".join(lines))
+
+def build_alert_message(location, day, threshold):
+    """Alert text for a location on day (YYYY-MM-DD), or None if there is no forecast or it is below threshold"""
+    snapshot = forecast_store.get_snapshot()
+    aqi_value, aqi_category, hri_value, risk_category = get_forecast_data(location, day, snapshot)
+    if aqi_value is None:
+        return None
+    if threshold is not None and aqi_value < threshold:
+        return None
+    return "🔔 Daily alert\n" + format_response(location, day, aqi_value, aqi_category, hri_value, risk_category)
+
+def alert_sender(bot):
+    """send(chat_id, text) coroutine for alerts.broadcast, mapping Telegram errors to retry/give-up"""
+    async def send(chat_id, text):
+        try:
+            await bot.send_message(chat_id=chat_id, text=text)
+        except RetryAfter as e:
+            retry_after = e.retry_after
+            raise alerts.RetryLater(getattr(retry_after, 'total_seconds', lambda: retry_after)())
+        except Forbidden:
+            raise alerts.Undeliverable()
+        except BadRequest as e:
+            if 'chat not found' in str(e).lower():
+                raise alerts.Undeliverable()
+            raise
+        except NetworkError:
+            # Includes TimedOut
+            raise alerts.RetryLater()
+    return send
+
+async def send_daily_alerts(bot, day):
+    """Send the alerts of day (YYYY-MM-DD) to all subscribers that have not received them yet"""
+    store = get_alert_store()
+    totals = await alerts.broadcast(
+        store, day, build_alert_message, alert_sender(bot), split=split_message,
+        on_undeliverable=lambda chat_id: _in_worker(store.unsubscribe, chat_id),
+    )
+    for status, count in totals.items():
+        metrics.registry.inc('vitalair_alerts_total', count, status=status)
+    return totals
+
+async def inline_query_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    # Index lookups and cached answers only, so this stays on the event loop
+    with metrics.timer('vitalair_bot_inline_seconds'):
+        results = [
+            InlineQueryResultArticle(
+                id=f"{location}:{date_str}",
+                title=title,
+                description=description,
+                input_message_content=InputTextMessageContent(response),
+            )
+            for location, date_str, title, description, response in inline_results(update.inline_query.query)
+        ]
+        await update.inline_query.answer(results, cache_time=300)
+
+def register_handlers(application):
+    """Add the bot's command, message and inline query handlers to an Application"""
+    application.add_handler(TypeHandler(Update, shed_update), group=-1)
+    application.add_handler(CommandHandler("start", start))
+    application.add_handler(CommandHandler("help", help_command))
+    application.add_handler(CommandHandler("subscribe", subscribe_command))
+    application.add_handler(CommandHandler("unsubscribe", unsubscribe_command))
+    application.add_handler(CommandHandler("subscriptions", subscriptions_command))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, message_handler))
+    application.add_handler(InlineQueryHandler(inline_query_handler))
+    return application
+
+def build_application(token=None, request=None):
+    """
+    Create the bot Application with concurrent update processing and the shared handlers.
+    request replaces the HTTP client of the Bot API calls (e.g. an offline stub).
+    """
+    builder = (
+        Application.builder()
+        .token(token or TELEGRAM_TOKEN)
+        .base_url(f"{BOT_API_URL}/bot")
+        .concurrent_updates(CONCURRENT_UPDATES)
+        .update_queue(UpdateQueue())
+    )
+    if request is not None:
+        builder = builder.request(request)
+    return register_handlers(builder.build())
+
+# Update types the bot handles
+ALLOWED_UPDATES = [Update.MESSAGE, Update.INLINE_QUERY]
+
+_stop_event = None
+_stop_loop = None
+_webhook_server = None
+
+def webhook_app(application, path=WEBHOOK_PATH, secret=WEBHOOK_SECRET):
+    """
+    ASGI app receiving Telegram updates.
+    Each update is put on application.update_queue and acknowledged at once; the Application processes them concurrently.
+    """
+    from starlette.applications import Starlette
+    from starlette.responses import Response
+    from starlette.routing import Route
+
+    async def receive_update(request):
+        if secret and request.headers.get('X-Telegram-Bot-Api-Secret-Token') != secret:
+            return Response(status_code=403)
+        try:
+            update = Update.de_json(await request.json(), application.bot)
+        except Exception as e:
+            logger.warning(f"Invalid webhook update: {e}")
+            return Response(status_code=400)
+        metrics.registry.inc('vitalair_bot_webhook_updates')
+        await application.update_queue.put(update)
+        return Response()
+
+    async def health(request):
+        return Response('ok')
+
+    return Starlette(routes=[
+        Route(path, receive_update, methods=['POST']),
+        Route('/healthz', health, methods=['GET']),
+    ])
+
+async def _run_webhook(application):
+    global _webhook_server
+    import uvicorn
+
+    if not WEBHOOK_URL:
+        raise ValueError("VITALAIR_WEBHOOK_URL must be set in webhook mode.")
+    await application.bot.set_webhook(
+        url=f"{WEBHOOK_URL.rstrip('/')}{WEBHOOK_PATH}",
+        allowed_updates=ALLOWED_UPDATES,
+        secret_token=WEBHOOK_SECRET,
+        max_connections=min(CONCURRENT_UPDATES, 100),
+    )
+    class Server(uvicorn.Server):
+        # uvicorn's own handlers re-raise SIGTERM after serving, which would kill the process before
+        # serve() shuts the Application down; serve() handles the signals instead
+        def capture_signals(self):
+            return contextlib.nullcontext()
+
+    config = uvicorn.Config(webhook_app(application), host='0.0.0.0', port=WEBHOOK_PORT, log_level='warning')
+    _webhook_server = Server(config)
+    logger.info(f"Receiving updates on port {WEBHOOK_PORT} at {WEBHOOK_PATH}")
+    # Returns when the server is told to exit (request_stop, called by stop_bot or on SIGTERM/SIGINT)
+    await _webhook_server.serve()
+
+async def serve(application, mode=None):
+    """Receive and answer updates by polling or webhook until stop_bot() is called, then shut down"""
+    global _stop_event, _stop_loop
+    mode = mode or BOT_MODE
+    if mode not in ('polling', 'webhook'):
+        raise ValueError(f"Unknown bot mode '{mode}', expected 'polling' or 'webhook'.")
+    _stop_event = asyncio.Event()
+    _stop_loop = asyncio.get_running_loop()
+    # SIGTERM (e.g. a redeploy) and Ctrl+C stop the bot through the same shutdown as stop_bot()
+    handled = []
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            _stop_loop.add_signal_handler(sig, request_stop)
+            handled.append(sig)
+        except (NotImplementedError, RuntimeError, ValueError):
+            # Not on the main thread, or not supported by the platform's event loop
+            pass
+
+    await application.initialize()
+    await application.start()
+    alert_task = None
+    if ALERTS_ENABLED:
+        alert_task = asyncio.create_task(alerts.run_daily(lambda day: send_daily_alerts(application.bot, day)))
+    try:
+        if mode == 'webhook':
+            await _run_webhook(application)
+        else:
+            await application.updater.start_polling(allowed_updates=ALLOWED_UPDATES)
+            await _stop_event.wait()
+    finally:
+        if alert_task is not None:
+            alert_task.cancel()
+        if application.updater and application.updater.running:
+            await application.updater.stop()
+        await application.stop()
+        await application.shutdown()
+        shutdown_executor()
+        for sig in handled:
+            _stop_loop.remove_signal_handler(sig)
+
+def request_stop():
+    """Make serve() return (callable from any thread)"""
+    if _webhook_server is not None:
+        _webhook_server.should_exit = True
+    if _stop_event is not None:
+        _stop_loop.call_soon_threadsafe(_stop_event.set)
 
 def stop_bot():
     """Stop the bot gracefully"""
-    global is_running, application
+    global is_running
     if is_running and application:
         logger.info("Stopping Telegram bot...")
-        application.stop()
+        request_stop()
         is_running = False
 
 async def run_async_polling():
-    """Run the bot with polling, properly awaiting async operations"""
+    """Run the bot in the configured mode (polling by default), properly awaiting async operations"""
     global is_running, application
     
     try:
-        # Create the Application
-        application = Application.builder().token(TELEGRAM_TOKEN).build()
+        # Create the Application with the shared handlers
+        application = build_application()
         
-        # Add handlers
-        application.add_handler(CommandHandler("start", start))
-        application.add_handler(CommandHandler("help", help_command))
-        application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, message_handler))
+        # Parse the forecast data before the first message arrives
+        forecast_store.warm_up()
+        metrics.start(port=METRICS_PORT)
         
         # Run the bot
-        logger.info("Starting Telegram bot with async polling...")
+        logger.info(f"Starting Telegram bot in {BOT_MODE} mode...")
         is_running = True
-        
-        # Start the bot with proper async handling
-        await application.initialize()
-        await application.start()
-        await application.updater.start_polling(allowed_updates=Update.ALL_TYPES)
-        
-        # Keep the bot running
-        while is_running:
-            await asyncio.sleep(1)
+        await serve(application)
             
     except Exception as e:
-        logger.error(f"Error in async polling: {e}")
+        logger.error(f"Error running the bot: {e}")
     finally:
-        if application:
-            # Properly shutdown the application
-            await application.stop()
-            await application.shutdown()
         is_running = False
         logger.info("Bot has stopped")
 
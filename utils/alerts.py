@@ -0,0 +1,276 @@
+import os
+import time
+import random
+import sqlite3
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# SQLite file with the subscriptions and the delivery progress of each daily run
+DB_PATH = os.getenv("VITALAIR_SUBSCRIPTIONS_DB", "./data/subscriptions.db")
+# Local time (HH:MM) of the daily alert run
+ALERT_TIME = os.getenv("VITALAIR_ALERT_TIME", "07:00")
+# Messages per second over all chats (Telegram allows about 30)
+GLOBAL_RATE = float(os.getenv("VITALAIR_ALERT_RATE", "25"))
+# Chats being sent to at once
+CONCURRENT_CHATS = 50
+MAX_ATTEMPTS = 5
+# Days of delivery progress kept
+DELIVERY_RETENTION_DAYS = 7
+# Seconds between the messages of one chat (Telegram allows about one per second)
+PER_CHAT_INTERVAL = 1.0
+
+SENT, SKIPPED, FAILED, UNDELIVERABLE = 'sent', 'skipped', 'failed', 'undeliverable'
+# A chat whose alert was being sent when the process stopped; never retried, so nobody gets an alert twice
+SENDING = 'sending'
+
+
+class RetryLater(Exception):
+    """A send failed temporarily; retry after `seconds` (exponential backoff if None)"""
+
+    def __init__(self, seconds=None):
+        super().__init__(seconds)
+        self.seconds = seconds
+
+
+class Undeliverable(Exception):
+    """A send failed permanently (e.g. the user blocked the bot); the chat is unsubscribed"""
+
+
+class SubscriptionStore:
+    """
+    Subscriptions (chat, location, optional AQI threshold) and per-day delivery progress in SQLite.
+    A chat's delivery row is written before its alert is sent and updated once it is settled, so a
+    restarted run skips it.
+    """
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS subscriptions ("
+                " chat_id INTEGER NOT NULL, location TEXT NOT NULL, threshold REAL, created TEXT NOT NULL,"
+                " PRIMARY KEY (chat_id, location))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS deliveries ("
+                " day TEXT NOT NULL, chat_id INTEGER NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL,"
+                " updated TEXT NOT NULL, PRIMARY KEY (day, chat_id))"
+            )
+
+    def subscribe(self, chat_id, location, threshold=None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO subscriptions (chat_id, location, threshold, created) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (chat_id, location) DO UPDATE SET threshold = excluded.threshold",
+                (chat_id, location, threshold, datetime.now().isoformat(timespec='seconds')),
+            )
+
+    def unsubscribe(self, chat_id, location=None):
+        """Remove one or all subscriptions of a chat; returns the number removed"""
+        with self._lock, self._conn:
+            if location is None:
+                cursor = self._conn.execute("DELETE FROM subscriptions WHERE chat_id = ?", (chat_id,))
+            else:
+                cursor = self._conn.execute("DELETE FROM subscriptions WHERE chat_id = ? AND location = ?",
+                                            (chat_id, location))
+            return cursor.rowcount
+
+    def subscriptions(self, chat_id):
+        """(location, threshold) pairs of a chat"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT location, threshold FROM subscriptions WHERE chat_id = ? ORDER BY location", (chat_id,)
+            ).fetchall()
+
+    def pending(self, day):
+        """{chat_id: [(location, threshold), ...]} for the chats without a delivery row on day"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT s.chat_id, s.location, s.threshold FROM subscriptions s"
+                " LEFT JOIN deliveries d ON d.day = ? AND d.chat_id = s.chat_id"
+                " WHERE d.chat_id IS NULL ORDER BY s.chat_id, s.location",
+                (day,),
+            ).fetchall()
+        chats = {}
+        for chat_id, location, threshold in rows:
+            chats.setdefault(chat_id, []).append((location, threshold))
+        return chats
+
+    def record(self, day, results):
+        """Save (chat_id, status, attempts) delivery rows"""
+        updated = datetime.now().isoformat(timespec='seconds')
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO deliveries (day, chat_id, status, attempts, updated) VALUES (?, ?, ?, ?, ?)",
+                [(day, chat_id, status, attempts, updated) for chat_id, status, attempts in results],
+            )
+
+    def counts(self, day):
+        """{status: number of chats} of the deliveries on day"""
+        with self._lock:
+            return dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM deliveries WHERE day = ? GROUP BY status", (day,)
+            ).fetchall())
+
+    def prune(self, before_day):
+        """Delete the delivery rows of the days before before_day; returns the number deleted"""
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM deliveries WHERE day < ?", (before_day,)).rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RateLimiter:
+    """Async limiter spacing acquisitions at least 1 / rate seconds apart"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds):
+        """Hold every acquisition back for seconds (after a flood-control reply)"""
+        self._next = max(self._next, time.monotonic() + seconds)
+
+
+async def _send_with_retry(send, limiter, chat_id, text, max_attempts=MAX_ATTEMPTS, before_send=None):
+    """Send one alert; returns (status, attempts). before_send() is awaited once, just before the first attempt."""
+    for attempt in range(1, max_attempts + 1):
+        await limiter.acquire()
+        if before_send is not None and attempt == 1:
+            await before_send()
+        try:
+            await send(chat_id, text)
+            return SENT, attempt
+        except Undeliverable:
+            return UNDELIVERABLE, attempt
+        except RetryLater as e:
+            if e.seconds:
+                limiter.pause(e.seconds)
+                delay = e.seconds
+            else:
+                delay = min(60.0, 2 ** (attempt - 1)) * (0.5 + random.random())
+            if attempt < max_attempts:
+                await asyncio.sleep(delay)
+        except Exception as e:
+            logger.error(f"Unexpected error sending an alert to chat {chat_id}: {e}")
+            return FAILED, attempt
+    return FAILED, max_attempts
+
+
+async def broadcast(store, day, build_message, send, split=None, rate=GLOBAL_RATE, concurrency=CONCURRENT_CHATS,
+                    on_undeliverable=None):
+    """
+    Send the alerts of day to every pending subscriber.
+    build_message(location, day, threshold) returns the alert text, or None when there is nothing to send.
+    It is called once per distinct (location, threshold), not per subscriber.
+    send(chat_id, text) is a coroutine raising RetryLater or Undeliverable on failures.
+    split(text) cuts a chat's alert into messages short enough to send.
+    on_undeliverable(chat_id) is awaited for the chats that can no longer be reached.
+    Each chat is marked SENDING just before its first message goes out and given its final status right
+    after the last, so however the process stops, a restarted run sends nobody the same alert twice.
+    The store is only used from worker threads. Returns {status: chats} for this run.
+    """
+    cutoff = (datetime.strptime(day, "%Y-%m-%d") - timedelta(days=DELIVERY_RETENTION_DAYS)).strftime("%Y-%m-%d")
+    await asyncio.to_thread(store.prune, cutoff)
+    pending = await asyncio.to_thread(store.pending, day)
+    if not pending:
+        return {}
+    logger.info(f"Sending the {day} alerts to {len(pending)} chats")
+
+    messages = {}
+    def message(location, threshold):
+        key = (location, threshold)
+        if key not in messages:
+            messages[key] = build_message(location, day, threshold)
+        return messages[key]
+
+    limiter = RateLimiter(rate)
+    totals = {}
+
+    async def deliver(chat_id, subscriptions):
+        parts = [text for text in (message(location, threshold) for location, threshold in subscriptions) if text]
+        if not parts:
+            return chat_id, SKIPPED, 0
+        text = "\n\n".join(parts)
+
+        async def mark_sending():
+            await asyncio.to_thread(store.record, day, [(chat_id, SENDING, 0)])
+
+        attempts = 0
+        for i, chunk in enumerate(split(text) if split else [text]):
+            if i:
+                await asyncio.sleep(PER_CHAT_INTERVAL)
+            status, tries = await _send_with_retry(send, limiter, chat_id, chunk,
+                                                   before_send=None if i else mark_sending)
+            attempts += tries
+            if status != SENT:
+                break
+        if status == UNDELIVERABLE and on_undeliverable is not None:
+            await on_undeliverable(chat_id)
+        return chat_id, status, attempts
+
+    # `concurrency` workers share one iterator, so a slow retry only holds up its own chat
+    chats = iter(pending.items())
+
+    async def worker():
+        for chat_id, subscriptions in chats:
+            result = await deliver(chat_id, subscriptions)
+            await asyncio.to_thread(store.record, day, [result])
+            totals[result[1]] = totals.get(result[1], 0) + 1
+
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, len(pending)))))
+    logger.info(f"Alerts for {day}: {totals}")
+    return totals
+
+
+def next_run(now, at=ALERT_TIME):
+    """The next datetime at local time `at` (HH:MM) after now"""
+    hour, minute = (int(part) for part in at.split(':'))
+    run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if run <= now:
+        run += timedelta(days=1)
+    return run
+
+
+async def run_daily(job, at=ALERT_TIME):
+    """
+    Call `await job(day)` every day at local time `at`.
+    If today's run time has already passed, it runs at once; delivery progress makes a rerun resume.
+    """
+    now = datetime.now()
+    hour, minute = (int(part) for part in at.split(':'))
+    if now >= now.replace(hour=hour, minute=minute, second=0, microsecond=0):
+        await _run_job(job, now.strftime("%Y-%m-%d"))
+    while True:
+        run = next_run(datetime.now(), at)
+        await asyncio.sleep((run - datetime.now()).total_seconds())
+        await _run_job(job, run.strftime("%Y-%m-%d"))
+
+
+async def _run_job(job, day):
+    try:
+        await job(day)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"Daily alert run for {day} failed: {e}")
@@ -0,0 +1,135 @@
+import os
+import re
+import sys
+import logging
+import pandas as pd
+
+from utils import load_data
+
+logger = logging.getLogger(__name__)
+
+# Per-station model outputs, relative to the data directory
+RESULTS_DIR = "results"
+AQI_RESULTS = "Forecsted AQI results"
+HRI_RESULTS = "Forecasted HRI results"
+AQI_PATTERN = re.compile(r"^AQI_forecast_(.+)\.csv$")
+HRI_PATTERN = re.compile(r"^HRI_forecast_(.+)\.csv$")
+
+# The joined table read by the forecast store
+FORECAST_FILE = "combined_forecast.csv"
+COLUMNS = ['Date', 'Location', 'AQI_Forecast', 'HRI']
+
+# Largest allowed difference between the AQI of an HRI file and the AQI file of the same station
+AQI_TOLERANCE = 1e-6
+
+
+def _station_files(directory, pattern):
+    """{location: path} of the per-station files in directory"""
+    files = {}
+    for filename in sorted(os.listdir(directory)):
+        match = pattern.match(filename)
+        if match:
+            files[match.group(1)] = os.path.join(directory, filename)
+    return files
+
+
+def _read_station(path, columns):
+    df = pd.read_csv(path, dtype={column: 'float64' for column in columns if column != 'Date'})
+    missing = [column for column in columns if column not in df.columns]
+    if missing:
+        raise ValueError(f"{path} has no {', '.join(missing)} column")
+    df = df[columns]
+    df['Date'] = pd.to_datetime(df['Date'], format='%Y-%m-%d')
+    return df
+
+
+def build_forecast_table(results_dir):
+    """
+    Join the per-station AQI and HRI forecasts in results_dir into one frame with one row per
+    (Location, Date), sorted by Location then Date. Raises ValueError listing every problem found.
+    """
+    aqi_files = _station_files(os.path.join(results_dir, AQI_RESULTS), AQI_PATTERN)
+    hri_files = _station_files(os.path.join(results_dir, HRI_RESULTS), HRI_PATTERN)
+    problems = []
+    for location in sorted(set(aqi_files) ^ set(hri_files)):
+        kind = 'HRI' if location in aqi_files else 'AQI'
+        problems.append(f"{location}: no {kind} forecast file")
+
+    frames = []
+    for location in sorted(set(aqi_files) & set(hri_files)):
+        aqi = _read_station(aqi_files[location], ['Date', 'AQI_Forecast'])
+        hri = _read_station(hri_files[location], ['Date', 'AQI_Forecast', 'HRI'])
+        for name, df in (('AQI', aqi), ('HRI', hri)):
+            if df.isna().any().any():
+                problems.append(f"{location}: missing values in the {name} file")
+            duplicates = df['Date'][df['Date'].duplicated()]
+            if len(duplicates):
+                problems.append(f"{location}: duplicate dates in the {name} file "
+                                f"({', '.join(duplicates.dt.strftime('%Y-%m-%d').unique()[:5])})")
+        df = aqi.merge(hri, on='Date', how='outer', suffixes=('', '_hri'), indicator=True)
+        unmatched = df[df['_merge'] != 'both']
+        if len(unmatched):
+            problems.append(f"{location}: {len(unmatched)} dates only in one of the AQI and HRI files "
+                            f"({', '.join(unmatched['Date'].dt.strftime('%Y-%m-%d')[:5])})")
+        both = df[df['_merge'] == 'both']
+        difference = (both['AQI_Forecast'] - both['AQI_Forecast_hri']).abs()
+        if (difference > AQI_TOLERANCE).any():
+            problems.append(f"{location}: the HRI file disagrees with the AQI file on {(difference > AQI_TOLERANCE).sum()} "
+                            f"AQI values (largest difference {difference.max():.6g})")
+        both = both[['Date', 'AQI_Forecast', 'HRI']].copy()
+        both['Location'] = location
+        frames.append(both)
+
+    if not frames and not problems:
+        problems.append(f"no per-station forecast files in {results_dir}")
+    if problems:
+        raise ValueError("Invalid forecast results:\n  " + "\n  ".join(problems))
+
+    table = pd.concat(frames, ignore_index=True)[COLUMNS]
+    table.sort_values(by=['Location', 'Date'], inplace=True, kind='stable')
+    table.reset_index(drop=True, inplace=True)
+    return table
+
+
+def validate_forecast_table(df):
+    """Raise ValueError unless df has the joined columns and one row per (Location, Date), in order"""
+    missing = [column for column in COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"Forecast table has no {', '.join(missing)} column")
+    if df[COLUMNS].isna().any().any():
+        raise ValueError("Forecast table has missing values")
+    locations = df['Location'].to_numpy(dtype=object)
+    dates = df['Date'].to_numpy(dtype='datetime64[D]')
+    same_location = locations[1:] == locations[:-1]
+    if (locations[1:] < locations[:-1]).any() or (same_location & (dates[1:] < dates[:-1])).any():
+        raise ValueError("Forecast table is not sorted by (Location, Date)")
+    if (same_location & (dates[1:] == dates[:-1])).any():
+        raise ValueError("Forecast table has several rows for one (Location, Date)")
+
+
+def write_forecast_table(df, path):
+    """Write the joined table as CSV (dates as YYYY-MM-DD), replacing path atomically"""
+    validate_forecast_table(df)
+    tmp_path = path + ".tmp"
+    df.to_csv(tmp_path, index=False, date_format='%Y-%m-%d')
+    os.replace(tmp_path, path)
+    return path
+
+
+def build(data_dir=None):
+    """Rebuild the joined forecast table of a data directory from its per-station results"""
+    data_dir = os.path.abspath(data_dir or load_data.DIR)
+    table = build_forecast_table(os.path.join(data_dir, RESULTS_DIR))
+    path = write_forecast_table(table, os.path.join(data_dir, FORECAST_FILE))
+    logger.info(f"Wrote {path} ({len(table)} rows, {table['Location'].nunique()} locations)")
+    return path
+
+
+if __name__ == "__main__":
+    # Usage: python -m utils.build_forecast [data directory]
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    try:
+        build(sys.argv[1] if len(sys.argv) > 1 else None)
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
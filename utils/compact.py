@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+
+def compact_frame(df):
+    """
+    Compact, indexed layout of the dataset: datetime64 dates, categorical station/state codes,
+    float32 measures and a sorted (StateCode, StationId) index.
+    """
+    df = df.dropna().drop(columns=['ID_Date'], errors='ignore')
+    df = df.rename(columns={'PM2.5': 'PM2_5'})
+    station_ids = sorted(df.StationId.unique())
+    df['StationId'] = pd.Categorical(df.StationId.astype('str'), categories=[str(stn) for stn in station_ids])
+    df['StateCode'] = df.StateCode.astype('category')
+    if 'HRI_Category' in df.columns:
+        df['HRI_Category'] = df.HRI_Category.astype('category')
+    measures = df.select_dtypes(include='float').columns
+    df[measures] = df[measures].astype('float32')
+    df = df.sort_values(by=['StateCode', 'StationId', 'Date'])
+    return df.set_index(["StateCode", "StationId"])
+
+
+def station_blocks(df):
+    """(StateCode, StationId) -> (start, stop) row range of a frame built by compact_frame()"""
+    index = df.index
+    if not len(index):
+        return {}
+    # Compare the integer level codes instead of materializing a tuple per row
+    changed = np.zeros(len(index), dtype=bool)
+    changed[0] = True
+    for codes in index.codes:
+        codes = np.asarray(codes)
+        changed[1:] |= codes[1:] != codes[:-1]
+    starts = np.flatnonzero(changed)
+    stops = np.r_[starts[1:], len(index)]
+    return {key: (start, stop) for key, start, stop in zip(index[starts].tolist(), starts.tolist(), stops.tolist())}
+
+
+def take_stations(df, blocks, keys, columns):
+    """Rows of the given (StateCode, StationId) keys, in key order, without scanning the index"""
+    positions = [np.arange(*blocks[key]) for key in keys]
+    positions = np.concatenate(positions) if positions else np.array([], dtype=np.int64)
+    return df.take(positions)[columns]
+
+
+def to_rows(tb):
+    """Display values of a frame as data() rows: dates as YYYY-MM-DD, float32 as their shortest decimal"""
+    columns = []
+    for column in tb.columns:
+        values = tb[column]
+        if pd.api.types.is_datetime64_any_dtype(values.dtype):
+            values = np.datetime_as_string(values.to_numpy(dtype='datetime64[D]'), unit='D')
+        elif values.dtype == np.float32:
+            values = values.to_numpy().astype(str).astype(np.float64)
+        else:
+            values = values.to_numpy(dtype=object)
+        columns.append(values.tolist())
+    return [list(row) for row in zip(*columns)]
@@ -0,0 +1,101 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Maximum number of points sent per plotted series (0 disables downsampling)
+MAX_POINTS = int(os.getenv("VITALAIR_MAX_POINTS", "1000"))
+# 'lttb' (Largest-Triangle-Three-Buckets) or 'minmax' (min and max of each bucket)
+METHOD = os.getenv("VITALAIR_DOWNSAMPLE_METHOD", "lttb")
+
+
+def lttb_indices(x, y, max_points):
+    """
+    Indices of the points kept by Largest-Triangle-Three-Buckets.
+    x must be sorted. The first and last points are always kept.
+    """
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    # Interior points are split into max_points - 2 non-empty buckets
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    starts, stops = edges[:-1], edges[1:]
+    counts = stops - starts
+    avg_x = np.add.reduceat(x[1:n - 1], starts - 1) / counts
+    avg_y = np.add.reduceat(y[1:n - 1], starts - 1) / counts
+    # Third vertex of each triangle: the next bucket's average (the last point for the last bucket)
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    keep = np.empty(max_points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    # Each bucket depends on the point picked in the previous one; the work inside a bucket is vectorized
+    for i, (start, stop) in enumerate(zip(starts.tolist(), stops.tolist())):
+        bx = x[start:stop]
+        by = y[start:stop]
+        area = np.abs((x[a] - next_x[i]) * (by - y[a]) - (x[a] - bx) * (next_y[i] - y[a]))
+        a = start + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def minmax_indices(x, y, max_points):
+    """Indices of the minimum and maximum of each of max_points / 2 equal-size buckets, plus the end points"""
+    n = len(x)
+    if max_points >= n or max_points < 4:
+        return np.arange(n)
+
+    size = -(-n // ((max_points - 2) // 2))
+    n_buckets = -(-n // size)
+    # Pad the last bucket by repeating the last value, then look at all buckets at once
+    buckets = np.pad(y, (0, n_buckets * size - n), mode='edge').reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    lows = np.minimum(offsets + buckets.argmin(axis=1), n - 1)
+    highs = np.minimum(offsets + buckets.argmax(axis=1), n - 1)
+    return np.unique(np.concatenate(([0, n - 1], lows, highs)))
+
+
+_METHODS = {
+    'lttb': lttb_indices,
+    'minmax': minmax_indices,
+}
+
+
+def downsample_indices(x, y, max_points=MAX_POINTS, method=METHOD):
+    """Sorted indices of the points of one series that are worth plotting"""
+    if not max_points or len(x) <= max_points:
+        return np.arange(len(x))
+    return _METHODS[method](np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64), max_points)
+
+
+def _x_values(values):
+    if pd.api.types.is_numeric_dtype(values.dtype):
+        return values.to_numpy(dtype=np.float64)
+    if not pd.api.types.is_datetime64_any_dtype(values.dtype):
+        values = pd.to_datetime(values)
+    return values.to_numpy(dtype='datetime64[ns]').view(np.int64).astype(np.float64)
+
+
+def downsample_frame(df, x_column, y_columns, group_column=None, max_points=MAX_POINTS, method=METHOD):
+    """
+    Keep the rows of df needed to draw each y column (per group) with at most max_points points.
+    Rows must be sorted by x within each group and each group must be contiguous.
+    """
+    if not max_points or len(df) <= max_points:
+        return df
+
+    if group_column is None:
+        blocks = [(0, len(df))]
+    else:
+        groups = df[group_column].to_numpy()
+        starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+        blocks = zip(starts.tolist(), np.r_[starts[1:], len(df)].tolist())
+
+    x = _x_values(df[x_column])
+    ys = [df[column].to_numpy(dtype=np.float64) for column in y_columns]
+    keep = np.zeros(len(df), dtype=bool)
+    for start, stop in blocks:
+        for y in ys:
+            keep[start + downsample_indices(x[start:stop], y[start:stop], max_points, method)] = True
+    return df[keep]
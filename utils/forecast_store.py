@@ -0,0 +1,223 @@
+import os
+import time
+import logging
+import threading
+from functools import cached_property
+import numpy as np
+import pandas as pd
+
+from utils import load_data, shared_data
+from utils.load_data import read_csv
+from utils.build_forecast import FORECAST_FILE, validate_forecast_table
+
+logger = logging.getLogger(__name__)
+
+# How often (in seconds) the files are stat()-ed to detect a new version
+CHECK_INTERVAL = float(os.getenv("VITALAIR_FORECAST_CHECK_INTERVAL", "1.0"))
+
+
+def read_forecast(path):
+    """Parse the joined forecast table (python -m utils.build_forecast) into a frame sorted by (Location, Date)"""
+    df = read_csv(path)
+    if 'Date' not in df.columns or 'Location' not in df.columns:
+        raise ValueError("Forecast CSV file does not contain Date and Location columns.")
+    df.sort_values(by=['Location', 'Date'], inplace=True, kind='stable')
+    df.reset_index(drop=True, inplace=True)
+    validate_forecast_table(df)
+    return df
+
+
+class ForecastIndex:
+    """
+    Lookup structures over a forecast frame sorted by (Location, Date).
+    Each location occupies one contiguous block of rows, so point and date range queries are binary
+    searches inside the location's block. Nothing is kept per row but the dates and the location codes:
+    no Python objects, which every process would hold a copy of. Date strings and location names are
+    made only for the rows asked for (date_strings, location_names).
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.dates = df['Date'].to_numpy(dtype='datetime64[D]')
+        location = df['Location']
+        if isinstance(location.dtype, pd.CategoricalDtype):
+            # The codes of a shared frame are a view of its published copy
+            self.location_codes = location.cat.codes.to_numpy()
+            self.location_categories = np.asarray(location.cat.categories, dtype=str)
+        else:
+            codes, categories = pd.factorize(location)
+            self.location_codes = codes
+            self.location_categories = np.asarray(categories, dtype=str)
+        self.columns = {column: df[column].to_numpy() for column in df.columns
+                        if pd.api.types.is_numeric_dtype(df[column].dtype)}
+
+        # location -> (start, stop) block of rows
+        self.blocks = {}
+        if len(df):
+            codes = self.location_codes
+            starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+            stops = np.r_[starts[1:], len(df)]
+            names = self.location_categories[codes[starts]].tolist()
+            self.blocks = {name: (start, stop) for name, start, stop in zip(names, starts.tolist(), stops.tolist())}
+
+    def date_strings(self, rows):
+        """'YYYY-MM-DD' dates of the rows (a slice or row offsets) as a list"""
+        return np.datetime_as_string(self.dates[rows], unit='D').tolist()
+
+    def location_names(self, rows):
+        """Locations of the rows (a slice or row offsets) as a list"""
+        return self.location_categories[self.location_codes[rows]].tolist()
+
+    def period(self, rows=slice(None)):
+        """First and last 'YYYY-MM-DD' date of the rows (all by default), or (None, None) if there are none"""
+        dates = self.dates[rows]
+        if not len(dates):
+            return None, None
+        return str(dates.min()), str(dates.max())
+
+    def row(self, location, date_str):
+        """Row offset for a location and a 'YYYY-MM-DD' date, or None (the first row on duplicates)"""
+        start, stop = self.blocks.get(location, (0, 0))
+        if start == stop:
+            return None
+        try:
+            date = np.datetime64(date_str, 'D')
+        except (TypeError, ValueError):
+            return None
+        row = start + int(np.searchsorted(self.dates[start:stop], date, side='left'))
+        if row < stop and self.dates[row] == date:
+            return row
+        return None
+
+    def value(self, column, location, date_str):
+        """Value of a column for a location and date, or None"""
+        row = self.row(location, date_str)
+        if row is None:
+            return None
+        return self.columns[column][row]
+
+    def location_slice(self, location):
+        """Slice of the rows for a location (empty if unknown)"""
+        start, stop = self.blocks.get(location, (0, 0))
+        return slice(start, stop)
+
+    def range_slice(self, location, start_date, end_date):
+        """Slice of the rows for a location with start_date <= Date <= end_date"""
+        start, stop = self.blocks.get(location, (0, 0))
+        dates = self.dates[start:stop]
+        lo = np.searchsorted(dates, np.datetime64(start_date, 'D'), side='left')
+        hi = np.searchsorted(dates, np.datetime64(end_date, 'D'), side='right')
+        return slice(start + int(lo), start + int(hi))
+
+    def date_rows(self, start_date, end_date):
+        """Row offsets of every location with start_date <= Date <= end_date"""
+        return np.flatnonzero((self.dates >= np.datetime64(start_date, 'D')) & (self.dates <= np.datetime64(end_date, 'D')))
+
+
+class ForecastSnapshot:
+    """
+    Parsed forecast table (AQI and HRI per location and date) for one version of the file.
+    A snapshot is never modified after it is built; callers must not mutate the frame.
+    """
+
+    def __init__(self, df, signature, version):
+        self.df = df
+        self.signature = signature
+        self.version = version
+        self.locations = sorted(set(df['Location'].unique()))
+        self.forecast = ForecastIndex(df)
+
+    @cached_property
+    def location_index(self):
+        """Prefix/fuzzy index over the location names, built on first use"""
+        from utils.location_index import LocationIndex
+        return LocationIndex(self.locations)
+
+
+class ForecastStore:
+    """
+    Process-wide holder of the forecast data.
+    The file is parsed once and a new snapshot is swapped in when its mtime or size changes.
+    """
+
+    def __init__(self, path, check_interval=CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._last_check = 0.0
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def _signature(self):
+        st = os.stat(self.path)
+        # Publishing the datasets (python -m utils.shared_data) also swaps in a new snapshot, attached to them
+        return (st.st_mtime_ns, st.st_size), shared_data.manifest_signature()
+
+    def _load(self, signature):
+        # Attach to the published copy (shared by every process) when it is built from the current file
+        df = shared_data.attach('forecast', self.path)
+        shared = df is not None
+        if df is None:
+            df = read_forecast(self.path)
+        self._version += 1
+        logger.info(f"Loaded forecast data version {self._version} ({len(df)} rows{', shared' if shared else ''})")
+        return ForecastSnapshot(df, signature, self._version)
+
+    def snapshot(self):
+        """Return the current snapshot, reloading the files first if they changed on disk"""
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._last_check < self.check_interval:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and now - self._last_check < self.check_interval:
+                return snapshot
+            try:
+                signature = self._signature()
+                if snapshot is None or snapshot.signature != signature:
+                    snapshot = self._load(signature)
+                    # Single reference assignment, so readers see either the old or the new snapshot
+                    self._snapshot = snapshot
+            except Exception as e:
+                if snapshot is None:
+                    raise
+                logger.error(f"Error reloading forecast data, keeping version {snapshot.version}: {e}")
+            self._last_check = now
+        return snapshot
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the shared store for the forecast table in the data directory"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                abs_path = os.path.abspath(load_data.DIR)
+                _store = ForecastStore(os.path.join(abs_path, FORECAST_FILE))
+    return _store
+
+
+def reset_store():
+    """Drop the shared store, so the next call re-creates it from the current data directory"""
+    global _store
+    with _store_lock:
+        _store = None
+
+
+def get_snapshot():
+    """Shortcut for get_store().snapshot()"""
+    return get_store().snapshot()
+
+
+def warm_up():
+    """Load the forecast data ahead of the first request, logging instead of raising on errors"""
+    try:
+        get_snapshot()
+    except Exception as e:
+        logger.error(f"Error loading forecast data: {e}")
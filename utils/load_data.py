@@ -1,9 +1,131 @@
-import pandas as pd
 import os
+import sys
+import logging
+import numpy as np
+import pandas as pd
 DIR = "./data"
 
+logger = logging.getLogger(__name__)
+
+# Binary columnar copy written next to each CSV by convert_csv()
+CACHE_SUFFIX = ".npz"
+
+_MEASURES = {
+    'PM2.5': 'float64',
+    'PM10': 'float64',
+    'NO2': 'float64',
+    'CO': 'float64',
+    'O3': 'float64',
+}
+
+# Explicit dtypes and date formats of the known CSV files, relative to DIR
+SCHEMAS = {
+    "train.csv": {
+        'date_format': '%d-%m-%y',
+        'dtype': {'ID_Date': 'str', 'StateCode': 'str', 'StationId': 'int64', 'Date': 'str', **_MEASURES,
+                  'AQI': 'float64', 'HIS': 'float64', 'HRI_Normalized': 'float64', 'HRI_Category': 'str'},
+    },
+    "other/train_processed.csv": {
+        'date_format': '%Y-%m-%d',
+        'dtype': {'ID_Date': 'str', 'StateCode': 'str', 'StationId': 'int64', 'Date': 'str', **_MEASURES},
+    },
+    "combined_AQI_forecast.csv": {
+        'date_format': '%Y-%m-%d',
+        'dtype': {'Date': 'str', 'AQI_Forecast': 'float64', 'Location': 'str'},
+    },
+    "combined_HRI_forecast.csv": {
+        'date_format': '%Y-%m-%d',
+        'dtype': {'Date': 'str', 'AQI_Forecast': 'float64', 'HRI': 'float64', 'Location': 'str'},
+    },
+    "combined_forecast.csv": {
+        'date_format': '%Y-%m-%d',
+        'dtype': {'Date': 'str', 'Location': 'str', 'AQI_Forecast': 'float64', 'HRI': 'float64'},
+    },
+}
+
+
+def _schema(path):
+    rel_path = os.path.relpath(path, os.path.abspath(DIR)).replace(os.sep, '/')
+    return SCHEMAS.get(rel_path)
+
+
+def cache_path(path):
+    """Path of the binary copy of a CSV file"""
+    return os.path.splitext(path)[0] + CACHE_SUFFIX
+
+
+def parse_csv(path):
+    """Parse a CSV file, using the explicit dtypes and date format when the file is known"""
+    schema = _schema(path)
+    if schema is None:
+        df = pd.read_csv(path)
+        if 'Date' in df.columns:
+            df.Date = pd.to_datetime(df.Date)
+        return df
+    df = pd.read_csv(path, dtype=schema['dtype'])
+    if 'Date' in df.columns:
+        df.Date = pd.to_datetime(df.Date, format=schema['date_format'])
+    return df
+
+
+def _is_fresh(path, binary_path):
+    try:
+        return os.stat(binary_path).st_mtime_ns >= os.stat(path).st_mtime_ns
+    except OSError:
+        return False
+
+
+def read_binary(binary_path):
+    """Load a frame written by convert_csv()"""
+    with np.load(binary_path, allow_pickle=False) as npz:
+        columns = npz['__columns__'].tolist()
+        return pd.DataFrame({column: npz[f'col{i}'] for i, column in enumerate(columns)})
+
+
+def read_csv(path):
+    """Read a CSV file, preferring its binary copy when that is at least as new as the CSV"""
+    binary_path = cache_path(path)
+    if _is_fresh(path, binary_path):
+        try:
+            return read_binary(binary_path)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable binary copy {binary_path}: {e}")
+    return parse_csv(path)
+
+
+def convert_csv(path):
+    """Write the typed binary copy of a CSV file next to it and return its path"""
+    df = parse_csv(path)
+    arrays = {'__columns__': np.array(df.columns.tolist())}
+    for i, column in enumerate(df.columns):
+        values = df[column]
+        if values.dtype == object or pd.api.types.is_string_dtype(values.dtype):
+            if values.isna().any():
+                raise ValueError(f"Column '{column}' has missing text values")
+            values = values.to_numpy().astype(str)
+        else:
+            values = values.to_numpy()
+        arrays[f'col{i}'] = values
+
+    binary_path = cache_path(path)
+    tmp_path = binary_path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, binary_path)
+    return binary_path
+
+
 def load_data(filename):
     abs_path = os.path.abspath(DIR)
-    df = pd.read_csv(f'{abs_path}/{filename}')
-    df.Date = pd.to_datetime(df.Date)
-    return df
+    return read_csv(f'{abs_path}/{filename}')
+
+
+if __name__ == "__main__":
+    # Usage: python -m utils.load_data [file relative to ./data ...]
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    abs_path = os.path.abspath(DIR)
+    for filename in sys.argv[1:] or list(SCHEMAS):
+        try:
+            logger.info(f"Wrote {convert_csv(os.path.join(abs_path, filename))}")
+        except Exception as e:
+            logger.error(f"Could not convert {filename}: {e}")
@@ -0,0 +1,116 @@
+import re
+from collections import defaultdict
+import numpy as np
+
+# Extra spellings of the forecast locations (case, separators and single words are handled automatically)
+ALIASES = {
+    'Crescent_chengalpattu': ('Chengalpet', 'Chengalpattu'),
+    'Ooty': ('Udhagamandalam', 'Ootacamund'),
+    'Tirupur': ('Tiruppur',),
+}
+
+_SEPARATORS = re.compile(r'[\s_\-.]+')
+
+
+def normalize(text):
+    """Lower-case text with runs of spaces, underscores, dashes and dots collapsed to one space"""
+    return _SEPARATORS.sub(' ', text).strip().lower()
+
+
+def trigrams(text):
+    """Set of character trigrams of normalized text, padded so short names still have some"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class LocationIndex:
+    """
+    Prefix trie and trigram index over location names and their aliases.
+    Built once per forecast snapshot; lookups never touch the forecast frames.
+    """
+
+    def __init__(self, locations, aliases=ALIASES):
+        self.locations = sorted(locations)
+        # Normalized key -> canonical location
+        self.keys = {}
+        for location in self.locations:
+            names = [location, *aliases.get(location, ())]
+            for name in names:
+                key = normalize(name)
+                self.keys.setdefault(key, location)
+                # Each word on its own ('chengalpattu') and without separators ('crescentchengalpattu')
+                words = key.split()
+                if len(words) > 1:
+                    self.keys.setdefault(''.join(words), location)
+                    for word in words:
+                        self.keys.setdefault(word, location)
+
+        # Trie nodes are dicts of child nodes; '' holds the sorted locations of every key below the node
+        self.trie = {'': set(self.locations)}
+        for key, location in self.keys.items():
+            node = self.trie
+            for char in key:
+                node = node.setdefault(char, {'': set()})
+                node[''].add(location)
+        self._freeze(self.trie)
+
+        # Trigram -> ids of the keys containing it, as arrays so scoring is one bincount
+        self.key_names = list(self.keys)
+        self.key_locations = [self.keys[key] for key in self.key_names]
+        postings = defaultdict(list)
+        sizes = []
+        for key_id, key in enumerate(self.key_names):
+            grams = trigrams(key)
+            sizes.append(len(grams))
+            for gram in grams:
+                postings[gram].append(key_id)
+        self.grams = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self.gram_sizes = np.array(sizes, dtype=np.float64)
+
+    @staticmethod
+    def _freeze(node):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            node[''] = sorted(node[''])
+            stack.extend(child for char, child in node.items() if char)
+
+    def resolve(self, text):
+        """Canonical location for an exact name or alias (any case/separators), else None"""
+        return self.keys.get(normalize(text))
+
+    def complete(self, prefix, limit=10):
+        """Locations with a name or alias starting with prefix"""
+        node = self.trie
+        for char in normalize(prefix):
+            node = node.get(char)
+            if node is None:
+                return []
+        return node[''][:limit]
+
+    def fuzzy(self, text, limit=10, threshold=0.3):
+        """Locations ranked by trigram similarity (Dice coefficient) of their closest name or alias"""
+        query = trigrams(normalize(text))
+        postings = [self.grams[gram] for gram in query if gram in self.grams]
+        if not postings:
+            return []
+        shared = np.bincount(np.concatenate(postings), minlength=len(self.key_names))
+        scores = 2 * shared / (len(query) + self.gram_sizes)
+        candidates = np.flatnonzero(scores >= threshold)
+        # Best first; keys are in location order, so a stable sort breaks ties by name
+        order = candidates[np.argsort(-scores[candidates], kind='stable')]
+        matches = []
+        for key_id in order.tolist():
+            location = self.key_locations[key_id]
+            if location not in matches:
+                matches.append(location)
+                if len(matches) == limit:
+                    break
+        return matches
+
+    def suggest(self, text, limit=10):
+        """Prefix matches first, then fuzzy matches; all locations for empty text"""
+        matches = self.complete(text, limit)
+        if len(matches) < limit:
+            matches += [location for location in self.fuzzy(text, limit) if location not in matches]
+        return matches[:limit]
@@ -0,0 +1,226 @@
+import os
+import time
+import bisect
+import logging
+import threading
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Off switch: with VITALAIR_METRICS=0 timer() returns a shared no-op context and nothing is recorded
+ENABLED = os.getenv("VITALAIR_METRICS", "1").lower() not in ('0', 'false', 'no', 'off')
+# Serve the Prometheus text format on this port (unset: not served)
+PORT = os.getenv("VITALAIR_METRICS_PORT")
+# Interface the metrics are served on; local only by default (0.0.0.0 exposes them to the network)
+HOST = os.getenv("VITALAIR_METRICS_HOST", "127.0.0.1")
+# Log a latency summary every N seconds (0: never)
+LOG_INTERVAL = float(os.getenv("VITALAIR_METRICS_LOG_INTERVAL", "60"))
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NULL_TIMER = nullcontext()
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (Prometheus style) with quantile estimates"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Estimate a quantile by linear interpolation inside its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class _Timer:
+    __slots__ = ('registry', 'name', 'labels', 'start')
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Registry:
+    """Process-wide histograms, counters and gauges"""
+
+    def __init__(self, enabled=ENABLED):
+        self.enabled = enabled
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_gauge(self, name, value, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+
+    def timer(self, name, **labels):
+        """Context manager recording its duration in seconds into the named histogram"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    def register_collector(self, prefix, collect):
+        """Export the numeric values of the dict returned by collect() as gauges named prefix_<key>"""
+        self._collectors.append((prefix, collect))
+
+    def histogram(self, name, **labels):
+        return self._histograms.get(self._key(name, labels))
+
+    def counter(self, name, **labels):
+        return self._counters.get(self._key(name, labels), 0)
+
+    def render_prometheus(self):
+        """All metrics in the Prometheus text exposition format"""
+        def label_str(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+            gauges = dict(self._gauges)
+        for prefix, collect in self._collectors:
+            for key, value in collect().items():
+                if isinstance(value, (int, float)):
+                    gauges[(f'{prefix}_{key}', ())] = value
+
+        typed = set()
+        for (name, labels), histogram in histograms:
+            if name not in typed:
+                lines.append(f'# TYPE {name} histogram')
+                typed.add(name)
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{label_str(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_bucket{label_str(labels, [("le", "+Inf")])} {histogram.count}')
+            lines.append(f'{name}_sum{label_str(labels)} {histogram.sum}')
+            lines.append(f'{name}_count{label_str(labels)} {histogram.count}')
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f'# TYPE {name} counter')
+                typed.add(name)
+            lines.append(f'{name}{label_str(labels)} {value}')
+        for (name, labels), value in sorted(gauges.items()):
+            if name not in typed:
+                lines.append(f'# TYPE {name} gauge')
+                typed.add(name)
+            lines.append(f'{name}{label_str(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """One line with count and p50/p95/p99 (ms) of every histogram"""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+        parts = []
+        for (name, labels), histogram in histograms:
+            label = ','.join(f'{k}={v}' for k, v in labels)
+            parts.append(f"{name}[{label}] n={histogram.count} p50={histogram.quantile(0.5) * 1000:.1f}ms "
+                         f"p95={histogram.quantile(0.95) * 1000:.1f}ms p99={histogram.quantile(0.99) * 1000:.1f}ms")
+        return '; '.join(parts)
+
+
+registry = Registry()
+
+
+def timer(name, **labels):
+    """Shortcut for registry.timer()"""
+    return registry.timer(name, **labels)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = registry.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_started = False
+
+
+def start(port=PORT, log_interval=LOG_INTERVAL, host=HOST):
+    """Start the /metrics endpoint and the periodic summary log line (once per process)"""
+    global _started
+    if not registry.enabled or _started:
+        return
+    _started = True
+
+    if port:
+        server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+        threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+        logger.info(f"Serving metrics on {host}:{port} at /metrics")
+
+    if log_interval:
+        def log_summary():
+            while True:
+                time.sleep(log_interval)
+                summary = registry.summary()
+                if summary:
+                    logger.info(f"Latency: {summary}")
+        threading.Thread(target=log_summary, name='metrics-log', daemon=True).start()
@@ -0,0 +1,47 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """
+    One token bucket per key (e.g. a Telegram user): `rate` tokens per second, at most `burst` saved up.
+    Only the `max_keys` most recently seen keys are tracked; a forgotten key starts again with a full bucket.
+    """
+
+    def __init__(self, rate, burst, max_keys=100_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        # key -> [tokens, last refill time, consecutive denials]
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def allow(self, key, now=None):
+        """Take one token for key; False if its bucket is empty"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                bucket[2] = 0
+                return True
+            bucket[2] += 1
+            return False
+
+    def denials(self, key):
+        """Requests of key denied in a row (0 after an allowed one)"""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            return bucket[2] if bucket else 0
+
+    def __len__(self):
+        return len(self._buckets)
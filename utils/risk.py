@@ -0,0 +1,40 @@
+def get_risk_category(hri_value):
+    # Updated thresholds to directly align with AQI categories, based on reference_aqi at 75th percentile (32.32735)
+    if hri_value < 1.55:  # Corresponds exactly to Good AQI (0-50)
+        return "Low"
+    elif hri_value < 3.09:  # Corresponds exactly to Moderate AQI (51-100)
+        return "Moderate"
+    elif hri_value < 4.64:  # Corresponds exactly to Unhealthy for Sensitive Groups AQI (101-150)
+        return "High"
+    else:  # Corresponds to Unhealthy or worse AQI (>150)
+        return "Very High"
+
+risk_mapping = {
+    "Low": {
+        "risk": "Low health risk.",
+        "message": "Air quality is good. Continue with normal outdoor activities but follow general health guidelines."
+    },
+    "Moderate": {
+        "risk": "Moderate health risk.",
+        "message": "Individuals with respiratory or heart conditions should be cautious. Consider limiting prolonged outdoor activities."
+    },
+    "High": {
+        "risk": "High health risk.",
+        "message": "There is a high risk of respiratory and cardiovascular issues such as asthma and heart disease. Preventive measures include: purchasing high quality masks and air purifiers, and covering your face while going outside."
+    },
+    "Very High": {
+        "risk": "Severe health risk.",
+        "message": "Air quality is very poor! Everyone should take precautions. Avoid going outside, use high-quality masks, and consider air purifiers indoors."
+    }
+}
+
+def get_aqi_message(category):
+    messages = {
+        "Good": "Air quality is satisfactory, and air pollution poses little or no risk.",
+        "Moderate": "Air quality is acceptable. However, there may be a risk for some people, particularly those who are unusually sensitive to air pollution.",
+        "Unhealthy for Sensitive Groups": "Members of sensitive groups may experience health effects. The general public is less likely to be affected.",
+        "Unhealthy": "Some members of the general public may experience health effects; members of sensitive groups may experience more serious health effects.",
+        "Very Unhealthy": "Health alert: The risk of health effects is increased for everyone.",
+        "Hazardous": "Health warning of emergency conditions: everyone is more likely to be affected."
+    }
+    return messages.get(category, "No information available for this category.")
@@ -0,0 +1,193 @@
+import os
+import sys
+import json
+import shutil
+import logging
+import numpy as np
+import pandas as pd
+
+from utils import load_data
+
+logger = logging.getLogger(__name__)
+
+# Directory of the published datasets (default: <data directory>/shared).
+# The files are memory-mapped read-only, so every process attached to them shares the same pages;
+# on Linux, /dev/shm keeps them in memory instead of the page cache of a disk file.
+SHARED_DIR = os.getenv("VITALAIR_SHARED_DIR")
+# Set to 0 to ignore the published datasets and parse the files in every process
+ENABLED = os.getenv("VITALAIR_SHARED_DATA", "1") != "0"
+MANIFEST = "manifest.json"
+
+
+def _forecast(path):
+    from utils.forecast_store import read_forecast
+    return read_forecast(path)
+
+
+def _observations(path):
+    from utils.compact import compact_frame
+    # The (StateCode, StationId) index is stored as two plain columns
+    return compact_frame(load_data.read_csv(path)).reset_index()
+
+
+# Published datasets: name -> (file relative to the data directory, function preparing its frame)
+DATASETS = {
+    'forecast': ("combined_forecast.csv", _forecast),
+    'train': ("train.csv", _observations),
+}
+
+
+def shared_dir():
+    return SHARED_DIR or os.path.join(os.path.abspath(load_data.DIR), 'shared')
+
+
+def source_path(name):
+    """Path of the file a dataset is built from"""
+    return os.path.join(os.path.abspath(load_data.DIR), DATASETS[name][0])
+
+
+def manifest(root=None):
+    """{dataset name: entry} of the published datasets (empty if nothing was published)"""
+    try:
+        with open(os.path.join(root or shared_dir(), MANIFEST)) as f:
+            return json.load(f)['datasets']
+    except FileNotFoundError:
+        return {}
+
+
+def manifest_signature():
+    """(mtime, size) of the manifest, or None; changes whenever a dataset is published"""
+    if not ENABLED:
+        return None
+    try:
+        st = os.stat(os.path.join(shared_dir(), MANIFEST))
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+def _source_stat(path):
+    st = os.stat(path)
+    return {'source': os.path.abspath(path), 'mtime_ns': st.st_mtime_ns, 'size': st.st_size}
+
+
+def _is_current(entry, path):
+    if entry is None:
+        return False
+    try:
+        stat = _source_stat(path)
+    except OSError:
+        return False
+    return all(entry.get(key) == value for key, value in stat.items())
+
+
+def _write_columns(directory, df):
+    """Save each column of df as .npy files in directory; categorical and text columns as codes + categories"""
+    columns = []
+    for i, column in enumerate(df.columns):
+        values = df[column]
+        entry = {'name': column, 'file': f'{i}.npy'}
+        if values.dtype == object or pd.api.types.is_string_dtype(values.dtype):
+            if values.isna().any():
+                raise ValueError(f"Column '{column}' has missing text values")
+            values = values.astype('category')
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            categories = values.cat.categories.to_numpy()
+            if categories.dtype == object:
+                categories = categories.astype(str)
+            entry['categories'] = f'{i}.categories.npy'
+            np.save(os.path.join(directory, entry['categories']), categories, allow_pickle=False)
+            values = values.cat.codes
+        np.save(os.path.join(directory, entry['file']), values.to_numpy(), allow_pickle=False)
+        columns.append(entry)
+    return columns
+
+
+def publish(datasets=None, force=False, root=None):
+    """
+    Build the datasets (all by default) from the files in the data directory and publish them to the
+    shared directory. Datasets already published from the current version of their file are skipped
+    unless force is set. Returns the names of the datasets written.
+    """
+    root = root or shared_dir()
+    os.makedirs(root, exist_ok=True)
+    previous = manifest(root)
+    entries = dict(previous)
+    written = []
+    for name in datasets or DATASETS:
+        path = source_path(name)
+        if not os.path.exists(path):
+            logger.warning(f"Not publishing {name}: {path} does not exist")
+            continue
+        if not force and _is_current(previous.get(name), path):
+            continue
+        stat = _source_stat(path)
+        df = DATASETS[name][1](path)
+        # A new directory per version: processes still mapping the previous one are not disturbed
+        directory = f"{name}-{stat['mtime_ns']}-{os.getpid()}"
+        tmp_path = os.path.join(root, directory + ".tmp")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        try:
+            columns = _write_columns(tmp_path, df)
+        except Exception:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        os.replace(tmp_path, os.path.join(root, directory))
+        entries[name] = {'directory': directory, **stat, 'rows': len(df), 'columns': columns}
+        written.append(name)
+        logger.info(f"Published {name} ({len(df)} rows) to {os.path.join(root, directory)}")
+
+    if written:
+        tmp_manifest = os.path.join(root, f"{MANIFEST}.{os.getpid()}.tmp")
+        with open(tmp_manifest, 'w') as f:
+            json.dump({'datasets': entries}, f, indent=2)
+        os.replace(tmp_manifest, os.path.join(root, MANIFEST))
+        # Keep the current and the previous version of each dataset, in case a reader has just read the old manifest
+        keep = {entry['directory'] for entry in (*entries.values(), *previous.values())}
+        for directory in os.listdir(root):
+            if os.path.isdir(os.path.join(root, directory)) and directory not in keep and not directory.endswith('.tmp'):
+                shutil.rmtree(os.path.join(root, directory), ignore_errors=True)
+    return written
+
+
+def attach(name, path=None):
+    """
+    Frame of a published dataset whose columns are read-only memory maps of the shared files (no copy).
+    Returns None when sharing is disabled, or the dataset is not published or older than its file.
+    """
+    if not ENABLED:
+        return None
+    path = path or source_path(name)
+    root = shared_dir()
+    try:
+        entry = manifest(root).get(name)
+        if not _is_current(entry, path):
+            return None
+        directory = os.path.join(root, entry['directory'])
+        # An empty file cannot be mapped
+        mmap_mode = 'r' if entry['rows'] else None
+        data = {}
+        for column in entry['columns']:
+            values = np.load(os.path.join(directory, column['file']), mmap_mode=mmap_mode, allow_pickle=False)
+            if 'categories' in column:
+                categories = np.load(os.path.join(directory, column['categories']), allow_pickle=False)
+                values = pd.Categorical.from_codes(values, categories=categories, validate=False)
+            data[column['name']] = values
+        return pd.DataFrame(data, copy=False)
+    except Exception as e:
+        logger.warning(f"Ignoring the published {name} dataset: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    # Usage: python -m utils.shared_data [--force] [dataset ...]
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    args = sys.argv[1:]
+    force = '--force' in args
+    names = [arg for arg in args if arg != '--force']
+    unknown = [name for name in names if name not in DATASETS]
+    if unknown:
+        sys.exit(f"Unknown datasets: {', '.join(unknown)} (known: {', '.join(DATASETS)})")
+    written = publish(names or None, force=force)
+    logger.info(f"Published {', '.join(written)}" if written else "Published datasets are up to date")
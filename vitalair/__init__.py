@@ -0,0 +1,5 @@
+"""
+Training and forecasting of the per-station AQI models (the N-BEATS + Gaussian process ensemble of notebooks/model.ipynb).
+
+Run with ``python -m vitalair --help``. TensorFlow and scikit-learn are only imported by the commands that need them.
+"""
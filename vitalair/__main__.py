@@ -0,0 +1,98 @@
+import sys
+import argparse
+import logging
+
+from vitalair import models, forecast
+from vitalair.train import FULL_RETRAIN_DAYS
+
+
+def train(args):
+    from vitalair.train import STEP_MODEL, train_all
+    summaries, failed, wall = train_all(args.stations, args.data_dir, args.workers, args.epochs, args.seed,
+                                        build=not args.no_build, gp=args.gp, lags=args.lags, horizon=args.horizon)
+    busy = sum(summary['seconds'] for summary in summaries)
+    for summary in summaries:
+        ensemble = summary['metrics']['ensemble']
+        # The stations' same-day AQI, and the next-day AQI of the forecasting ensemble
+        name = 'next day (all stations)' if summary['location'] == STEP_MODEL else summary['location']
+        print(f"{name:<24} {summary['rows']:>6} rows  {summary['seconds']:7.1f} s  "
+              f"MAE {ensemble['mae']:8.3f}  RMSE {ensemble['rmse']:8.3f}  R² {ensemble['r2']:6.3f}")
+    stations = sum(1 for summary in summaries if summary['location'] != STEP_MODEL)
+    print(f"{stations} stations trained in {wall:.1f} s wall-clock "
+          f"({busy:.1f} s of training, {busy / wall if wall else 0:.2f}x parallel speedup)")
+    if failed:
+        print(f"Failed: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+def run_forecast(args):
+    from vitalair.train import forecast_all
+    table = forecast_all(args.data_dir, args.horizon, build=not args.no_build)
+    print(f"Forecast {table['Location'].nunique()} stations for {args.horizon} days "
+          f"({table['Date'].min():%Y-%m-%d} to {table['Date'].max():%Y-%m-%d})")
+    return 0
+
+
+def update(args):
+    from vitalair.train import update_all
+    summary = update_all(args.data_dir, args.full_every, args.epochs, args.horizon, build=not args.no_build,
+                         full=args.full, workers=args.workers)
+    if summary['mode'] == 'full':
+        print(f"Retrained the forecasting models in {summary['seconds']:.1f} s")
+        if summary['failed']:
+            print(f"Failed: {', '.join(summary['failed'])}")
+            return 1
+    else:
+        print(f"Updated with {summary['windows']} new station-days up to {summary['last_date']} in {summary['seconds']:.1f} s "
+              f"(update {summary['updates']} since the full training on data up to {summary['full_last_date']})")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m vitalair', description='Train and run the per-station AQI models.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    train_parser = commands.add_parser('train', help='train every station in parallel and write data/results')
+    train_parser.add_argument('--stations', nargs='+',
+                              help='locations whose same-day models to train (default: every training file); '
+                                   'the forecasting ensemble is always trained on every station')
+    train_parser.add_argument('--workers', type=int, help='worker processes (default: one per available core)')
+    train_parser.add_argument('--epochs', type=int, default=models.EPOCHS)
+    train_parser.add_argument('--seed', type=int, default=models.SEED)
+    train_parser.add_argument('--gp', choices=models.GP_METHODS, default='auto',
+                              help=f"GP backend: the exact GP, the random Fourier feature approximation, or exact up to "
+                                   f"{models.EXACT_GP_MAX_ROWS} training rows (default)")
+    train_parser.add_argument('--lags', type=int, default=forecast.LAGS, help='days of history of a next-day prediction')
+    train_parser.add_argument('--horizon', type=int, default=forecast.HORIZON, help='days to forecast')
+    train_parser.add_argument('--data-dir', help='data directory (default: ./data)')
+    train_parser.add_argument('--no-build', action='store_true',
+                              help='only write the AQI forecasts and models, not the HRI files and the forecast table')
+    train_parser.set_defaults(run=train)
+
+    forecast_parser = commands.add_parser('forecast', help='forecast every station with the trained models, without retraining')
+    forecast_parser.add_argument('--horizon', type=int, default=forecast.HORIZON, help='days to forecast')
+    forecast_parser.add_argument('--data-dir', help='data directory (default: ./data)')
+    forecast_parser.add_argument('--no-build', action='store_true',
+                                 help='only write the AQI forecasts, not the HRI files and the forecast table')
+    forecast_parser.set_defaults(run=run_forecast)
+
+    update_parser = commands.add_parser('update', help='update the models with the new observations and forecast again')
+    update_parser.add_argument('--full-every', type=int, default=FULL_RETRAIN_DAYS,
+                               help='retrain everything once the data is this many days past the last full training')
+    update_parser.add_argument('--full', action='store_true', help='retrain everything now')
+    update_parser.add_argument('--epochs', type=int, default=forecast.UPDATE_EPOCHS, help='N-BEATS epochs on the new days')
+    update_parser.add_argument('--workers', type=int, help='cores of a full retraining (default: every available core)')
+    update_parser.add_argument('--horizon', type=int, default=forecast.HORIZON, help='days to forecast')
+    update_parser.add_argument('--data-dir', help='data directory (default: ./data)')
+    update_parser.add_argument('--no-build', action='store_true',
+                               help='only write the AQI forecasts, not the HRI files and the forecast table')
+    update_parser.set_defaults(run=update)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+import os
+import re
+import pandas as pd
+
+from utils import load_data
+
+# Per-station observation files, relative to the data directory
+STATIONS_DIR = "each station training files"
+FEATURES = ['PM2.5', 'PM10', 'NO2', 'CO', 'O3']
+TARGET = 'AQI'
+
+# Locations whose forecast files are named differently from their training file
+LOCATION_NAMES = {'Salem': 'salem'}
+
+_SUFFIX = re.compile(r'\s+iso$')
+
+
+def location_name(path):
+    """Location of a training file as used in the forecast files ('Crescent chengalpattu iso.csv' -> 'Crescent_chengalpattu')"""
+    name = _SUFFIX.sub('', os.path.splitext(os.path.basename(path))[0]).replace(' ', '_')
+    return LOCATION_NAMES.get(name, name)
+
+
+def station_files(directory=None):
+    """{location: path} of every training file in directory (the data directory's station files by default)"""
+    directory = directory or os.path.join(os.path.abspath(load_data.DIR), STATIONS_DIR)
+    return {location_name(filename): os.path.join(directory, filename)
+            for filename in sorted(os.listdir(directory)) if filename.endswith('.csv')}
+
+
+def read_station(path):
+    """Daily features and AQI of one station, indexed by date (rows with missing values dropped)"""
+    df = pd.read_csv(path, dtype={column: 'float64' for column in FEATURES + [TARGET]})
+    df = df.dropna(subset=['Date'])
+    # Some files have four-digit years (DD-MM-YYYY), the others two (DD-MM-YY)
+    date_format = '%d-%m-%Y' if len(df['Date'].iloc[0]) == 10 else '%d-%m-%y'
+    df['Date'] = pd.to_datetime(df['Date'], format=date_format)
+    df = df.set_index('Date')[FEATURES + [TARGET]].dropna().sort_index()
+    return df[~df.index.duplicated(keep='last')]
@@ -0,0 +1,190 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+
+from vitalair import models
+from vitalair.data import FEATURES, TARGET
+from vitalair.windows import WindowDataset
+
+# Every column is forecast: tomorrow's AQI depends on tomorrow's pollutants, which depend on today's
+COLUMNS = FEATURES + [TARGET]
+# Days of history a next-day prediction looks at
+LAGS = 14
+HORIZON = 28
+# Share of the training windows kept aside for the ensemble weights and the reported metrics
+VALIDATION_FRACTION = 0.2
+# Epochs of an incremental update on the new days only
+UPDATE_EPOCHS = 5
+
+
+def daily(df):
+    """The station's rows at daily frequency, with gaps between observations interpolated"""
+    return df[COLUMNS].asfreq('D').interpolate(limit_area='inside')
+
+
+class StepEnsemble:
+    """
+    Next-day model shared by every station: from the last `lags` days of a station's pollutants and AQI,
+    standardized with that station's means and scales, to the next day's. One call of each member
+    predicts a whole batch of stations.
+    last_dates holds each station's last day the models have seen, full_last_date the last day of the
+    latest full training and updates the number of incremental updates since.
+    """
+
+    def __init__(self, nbeats, gpr, weights, lags, locations, means, scales, last_dates, full_last_date=None, updates=0):
+        self.nbeats = nbeats
+        self.gpr = gpr
+        self.weights = tuple(weights)
+        self.lags = lags
+        self.locations = list(locations)
+        self.means = np.asarray(means, dtype=np.float64)
+        self.scales = np.asarray(scales, dtype=np.float64)
+        self.last_dates = dict(last_dates)
+        self.full_last_date = full_last_date or max(self.last_dates.values())
+        self.updates = updates
+
+    def predict(self, windows):
+        """(stations, lags, columns) standardized windows -> (stations, columns) standardized next days"""
+        flat = np.asarray(windows, dtype=np.float32).reshape(len(windows), -1)
+        w1, w2 = self.weights
+        # Calling the model skips the per-call setup of model.predict, which dominates for a few dozen rows
+        return w1 * np.asarray(self.nbeats(flat, training=False), dtype=np.float64) + w2 * self.gpr.predict(flat)
+
+    def save(self, directory):
+        import joblib
+        os.makedirs(directory, exist_ok=True)
+        self.nbeats.save(os.path.join(directory, "nbeats.keras"))
+        joblib.dump(self.gpr, os.path.join(directory, "gpr.joblib"))
+        with open(os.path.join(directory, "step.json"), 'w') as f:
+            json.dump({'lags': self.lags, 'columns': COLUMNS, 'locations': self.locations,
+                       'weights': {'nbeats': self.weights[0], 'gpr': self.weights[1]},
+                       'means': self.means.tolist(), 'scales': self.scales.tolist(),
+                       'last_dates': self.last_dates, 'full_last_date': self.full_last_date,
+                       'updates': self.updates}, f, indent=2)
+
+    @classmethod
+    def load(cls, directory):
+        import joblib
+        from tensorflow.keras.models import load_model
+        with open(os.path.join(directory, "step.json")) as f:
+            config = json.load(f)
+        if config['columns'] != COLUMNS:
+            raise ValueError(f"{directory} was trained on the columns {config['columns']}, not {COLUMNS}")
+        if 'last_dates' not in config:
+            raise ValueError(f"{directory} does not record the days it was trained on; retrain it with python -m vitalair train")
+        return cls(load_model(os.path.join(directory, "nbeats.keras")), joblib.load(os.path.join(directory, "gpr.joblib")),
+                   (config['weights']['nbeats'], config['weights']['gpr']), config['lags'], config['locations'],
+                   config['means'], config['scales'], config['last_dates'], config['full_last_date'], config['updates'])
+
+
+def fit_step_ensemble(frames, lags=LAGS, epochs=models.EPOCHS, seed=models.SEED, gp='auto'):
+    """
+    Train the next-day ensemble on the windows of every station in frames ({location: observations}).
+    Returns the StepEnsemble, the GP backend used and the next-day AQI metrics of the held-out windows.
+    """
+    locations = list(frames)
+    values = [daily(frames[location]).to_numpy(dtype=np.float64) for location in locations]
+    means = np.array([v.mean(axis=0) for v in values])
+    scales = np.array([v.std(axis=0) for v in values])
+    scales[scales == 0] = 1.0
+    dataset = WindowDataset([(v - m) / s for v, m, s in zip(values, means, scales)], lags, target=slice(None))
+    train, validation = dataset.split((1 - VALIDATION_FRACTION, VALIDATION_FRACTION), seed=seed)
+    X_train, y_train = dataset.arrays(train)
+    X_val, y_val = dataset.arrays(validation)
+    X_train, X_val = X_train.reshape(len(X_train), -1), X_val.reshape(len(X_val), -1)
+
+    nbeats = models.fit_nbeats(X_train, y_train, X_val, y_val, epochs=epochs)
+    gp = models.gp_method(gp, len(X_train))
+    gpr = models.fit_gpr(X_train, y_train, seed=seed, method=gp)
+    nbeats_pred = nbeats.predict(X_val, verbose=0)
+    gpr_pred = gpr.predict(X_val)
+    weights = models.ensemble_weights(y_val.ravel(), nbeats_pred.ravel(), gpr_pred.ravel())
+    last_dates = {location: frames[location].index.max().strftime('%Y-%m-%d') for location in locations}
+    ensemble = StepEnsemble(nbeats, gpr, weights, lags, locations, means, scales, last_dates)
+
+    # Next-day AQI in its own units
+    stations = dataset.stations[validation]
+    def aqi(standardized):
+        return standardized[:, -1] * scales[stations, -1] + means[stations, -1]
+    metrics = {
+        'nbeats': models.evaluate(aqi(y_val), aqi(nbeats_pred)),
+        'gpr': models.evaluate(aqi(y_val), aqi(gpr_pred)),
+        'ensemble': models.evaluate(aqi(y_val), aqi(weights[0] * nbeats_pred + weights[1] * gpr_pred)),
+    }
+    return ensemble, gp, metrics
+
+
+def new_windows(step, frames):
+    """
+    Standardized, flattened (X, y) windows of the days in frames ({location: observations}) after the step
+    model's last_dates, and the stations' new last dates. Each station's windows start `lags` days before
+    its first new day.
+    """
+    arrays, last_dates = [], {}
+    for location, mean, scale in zip(step.locations, step.means, step.scales):
+        df = daily(frames[location]).dropna()
+        first_new = int(np.searchsorted(df.index, pd.Timestamp(step.last_dates[location]), side='right'))
+        arrays.append((df.to_numpy(dtype=np.float64)[max(first_new - step.lags, 0):] - mean) / scale)
+        last_dates[location] = max(df.index[-1].strftime('%Y-%m-%d'), step.last_dates[location])
+    X, y = WindowDataset(arrays, step.lags, target=slice(None)).arrays()
+    return X.reshape(len(X), step.lags * len(COLUMNS)), y, last_dates
+
+
+def update_step_ensemble(step, frames, epochs=UPDATE_EPOCHS):
+    """
+    Update the step model in place with the days observed since its last training or update: N-BEATS
+    continues training on the new windows only and the GP adds them (see models.update_gpr). The
+    stations' scaling and the ensemble weights stay those of the last full training. Returns the number
+    of new windows.
+    """
+    X, y, last_dates = new_windows(step, frames)
+    if len(X):
+        models.update_nbeats(step.nbeats, X, y, epochs)
+        step.gpr = models.update_gpr(step.gpr, X, y)
+        step.updates += 1
+    step.last_dates = last_dates
+    return len(X)
+
+
+def rollout(step, windows, horizon=HORIZON):
+    """
+    Roll the next-day model forward from windows (stations, lags, columns): each day is predicted for all
+    stations in one batch and appended to their windows. Returns (stations, horizon, columns).
+    """
+    window = np.array(windows, dtype=np.float64)
+    predictions = np.empty((len(window), horizon, window.shape[2]))
+    for day in range(horizon):
+        predictions[:, day] = step.predict(window)
+        window[:, :-1] = window[:, 1:]
+        window[:, -1] = predictions[:, day]
+    return predictions
+
+
+def forecast(step, frames, horizon=HORIZON):
+    """
+    Forecast the AQI of every station of the step model for the `horizon` days after its last observation
+    in frames ({location: observations}). Returns a frame with the combined_AQI_forecast.csv columns
+    (Date, AQI_Forecast, Location), sorted by location and date.
+    """
+    missing = [location for location in step.locations if location not in frames]
+    if missing:
+        raise ValueError(f"No observations for {', '.join(missing)}")
+    windows, last_dates = [], []
+    for location, mean, scale in zip(step.locations, step.means, step.scales):
+        df = daily(frames[location]).dropna()
+        if len(df) < step.lags:
+            raise ValueError(f"{location} has {len(df)} days of observations, the model needs {step.lags}")
+        windows.append((df.to_numpy(dtype=np.float64)[-step.lags:] - mean) / scale)
+        last_dates.append(df.index[-1])
+    aqi = rollout(step, np.stack(windows), horizon)[:, :, -1] * step.scales[:, None, -1] + step.means[:, None, -1]
+
+    table = pd.DataFrame({
+        'Date': np.concatenate([pd.date_range(date + pd.Timedelta(days=1), periods=horizon, freq='D')
+                                for date in last_dates]),
+        'AQI_Forecast': aqi.ravel(),
+        'Location': np.repeat(step.locations, horizon),
+    })
+    table.sort_values(by=['Location', 'Date'], inplace=True, kind='stable')
+    table.reset_index(drop=True, inplace=True)
+    return table
@@ -0,0 +1,146 @@
+import numpy as np
+
+# Random Fourier features approximating the RBF kernel
+N_FEATURES = 512
+# Length scales tried by the search, as multiples of the median distance between standardized rows
+LENGTH_SCALE_FACTORS = np.geomspace(0.25, 2, 7)
+MEDIAN_SAMPLE = 1000
+
+
+def _as_array(X):
+    X = np.asarray(X, dtype=np.float64)
+    return X.reshape(-1, 1) if X.ndim == 1 else X
+
+
+def _target_scaling(y):
+    """Mean and standard deviation of y (per column for several outputs), with 1 for constant targets"""
+    scale = np.atleast_1d(y.std(axis=0))
+    scale[scale == 0] = 1.0
+    return y.mean(axis=0), scale if y.ndim > 1 else scale[0]
+
+
+class RandomFourierGP:
+    """
+    Gaussian process regression whose RBF kernel is approximated by n_features random Fourier features
+    (y may have several columns, which share the kernel and alpha).
+    The posterior mean is a ridge regression on the features, so a fit costs O(n·D²) instead of O(n³)
+    and memory O(n·D) instead of O(n²). The inputs are standardized and the target normalized, so
+    alpha is the noise variance relative to the signal variance and length_scale is in standard deviations.
+    """
+
+    def __init__(self, length_scale=1.0, alpha=1e-2, n_features=N_FEATURES, random_state=None):
+        self.length_scale = length_scale
+        self.alpha = alpha
+        self.n_features = n_features
+        self.random_state = random_state
+
+    def _init_features(self, X):
+        """Input scaling and random frequencies, fixed by the training inputs and random_state"""
+        self.x_mean_ = X.mean(axis=0)
+        self.x_scale_ = X.std(axis=0)
+        self.x_scale_[self.x_scale_ == 0] = 1.0
+        rng = np.random.default_rng(self.random_state)
+        self.frequencies_ = rng.standard_normal((X.shape[1], self.n_features))
+        self.offsets_ = rng.uniform(0, 2 * np.pi, self.n_features)
+
+    def _features(self, X):
+        # In place: at 100k rows each (rows, n_features) temporary is 400 MB
+        features = ((X - self.x_mean_) / self.x_scale_) @ (self.frequencies_ / self.length_scale)
+        features += self.offsets_
+        np.cos(features, out=features)
+        features *= np.sqrt(2.0 / self.n_features)
+        return features
+
+    def _solve(self, gram, projected):
+        """
+        Weights from the feature Gram matrix Φ'Φ and Φ'y. Keeps both, so rows can be added later, and the
+        eigendecomposition for the predictive std.
+        """
+        self.gram_, self.projected_ = gram, projected
+        self.eigenvalues_, self.eigenvectors_ = np.linalg.eigh(gram)
+        coefficients = (self.eigenvectors_.T @ projected).T / (self.eigenvalues_ + self.alpha)
+        self.weights_ = self.eigenvectors_ @ coefficients.T
+        return self
+
+    def fit(self, X, y):
+        X = _as_array(X)
+        y = np.asarray(y, dtype=np.float64)
+        self._init_features(X)
+        self.y_mean_, self.y_scale_ = _target_scaling(y)
+        features = self._features(X)
+        return self._solve(features.T @ features, features.T @ ((y - self.y_mean_) / self.y_scale_))
+
+    def partial_fit(self, X, y):
+        """
+        Add training rows to a fitted model in O(k·D² + D³), without the earlier rows: the result is the fit
+        on all the rows seen so far, with the input and target scaling of the first fit.
+        """
+        features = self._features(_as_array(X))
+        target = (np.asarray(y, dtype=np.float64) - self.y_mean_) / self.y_scale_
+        return self._solve(self.gram_ + features.T @ features, self.projected_ + features.T @ target)
+
+    def predict(self, X, return_std=False):
+        features = self._features(_as_array(X))
+        mean = features @ self.weights_ * self.y_scale_ + self.y_mean_
+        if not return_std:
+            return mean
+        # Posterior covariance of the weights: alpha * (Φ'Φ + alpha·I)^-1
+        projected = features @ self.eigenvectors_
+        variance = self.alpha * np.sum(projected ** 2 / (self.eigenvalues_ + self.alpha), axis=1)
+        std = np.sqrt(np.maximum(variance, 0))
+        return mean, (std[:, None] if mean.ndim > 1 else std) * self.y_scale_
+
+
+def median_distance(X, sample=MEDIAN_SAMPLE, seed=None):
+    """Median distance between (up to `sample`) rows of X"""
+    X = _as_array(X)
+    if len(X) > sample:
+        X = X[np.random.default_rng(seed).choice(len(X), sample, replace=False)]
+    squared = np.sum(X ** 2, axis=1)
+    distances = squared[:, None] + squared[None, :] - 2 * X @ X.T
+    return float(np.sqrt(np.median(np.maximum(distances[np.triu_indices(len(X), k=1)], 0)))) or 1.0
+
+
+def fit_random_fourier_gp(X, y, alphas, folds=3, length_scale_factors=LENGTH_SCALE_FACTORS,
+                          n_features=N_FEATURES, seed=None):
+    """
+    Pick the length scale and alpha of a RandomFourierGP by contiguous k-fold cross-validation (like the
+    exact search's cv=folds) and fit it on all of X.
+    For each length scale the features and their Gram matrix are computed once: the Gram matrix of a
+    fold's training part is the full one minus the fold's, and one eigendecomposition per fold gives the
+    validation predictions of every alpha at once.
+    """
+    X = _as_array(X)
+    y = np.asarray(y, dtype=np.float64)
+    alphas = np.asarray(alphas, dtype=np.float64)
+    model = RandomFourierGP(n_features=n_features, random_state=seed)
+    model._init_features(X)
+    model.y_mean_, model.y_scale_ = _target_scaling(y)
+    # (rows, outputs) even for a single output; the errors of all outputs are summed
+    target = ((y - model.y_mean_) / model.y_scale_).reshape(len(y), -1)
+    base_length_scale = median_distance((X - model.x_mean_) / model.x_scale_, seed=seed)
+    fold_rows = np.array_split(np.arange(len(X)), folds)
+
+    best = None
+    for factor in length_scale_factors:
+        model.length_scale = base_length_scale * factor
+        features = model._features(X)
+        gram = features.T @ features
+        projected = features.T @ target
+        errors = np.zeros(len(alphas))
+        for rows in fold_rows:
+            fold_features = features[rows]
+            eigenvalues, eigenvectors = np.linalg.eigh(gram - fold_features.T @ fold_features)
+            train_projected = eigenvectors.T @ (projected - fold_features.T @ target[rows])
+            # (features, alphas, outputs): the weights of every alpha from the one decomposition
+            weights = np.einsum('ij,jak->iak', eigenvectors,
+                                train_projected[:, None, :] / (eigenvalues[:, None, None] + alphas[None, :, None]))
+            predictions = np.einsum('nd,dak->nak', fold_features, weights)
+            errors += np.sum((predictions - target[rows, None, :]) ** 2, axis=(0, 2))
+        i = int(np.argmin(errors))
+        if best is None or errors[i] < best[0]:
+            best = (errors[i], model.length_scale, alphas[i], gram, projected)
+
+    _, model.length_scale, model.alpha, gram, projected = best
+    model.alpha = float(model.alpha)
+    return model._solve(gram, projected if y.ndim > 1 else projected[:, 0])
@@ -0,0 +1,106 @@
+import numpy as np
+
+# Training settings of notebooks/model.ipynb
+EPOCHS = 50
+BATCH_SIZE = 16
+SEED = 42
+GPR_ALPHAS = np.logspace(-3, 1, 10)
+GPR_SEARCH_ITERATIONS = 5
+GPR_SEARCH_FOLDS = 3
+
+# GP backends: the notebook's exact GP, the random Fourier feature approximation (vitalair/gp.py),
+# or exact up to EXACT_GP_MAX_ROWS training rows and approximate above
+GP_METHODS = ('exact', 'approx', 'auto')
+EXACT_GP_MAX_ROWS = 2000
+
+
+def build_nbeats_model(input_dim, outputs=1):
+    """The notebook's 'N-BEATS' regressor: two 128-unit ReLU layers, trained on MAE"""
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Input, Dense
+    model = Sequential([
+        Input(shape=(input_dim,)),
+        Dense(128, activation='relu'),
+        Dense(128, activation='relu'),
+        Dense(outputs),
+    ])
+    model.compile(optimizer='adam', loss='mae')
+    return model
+
+
+def fit_nbeats(X_train, y_train, X_val, y_val, epochs=EPOCHS, batch_size=BATCH_SIZE):
+    model = build_nbeats_model(X_train.shape[1], y_train.shape[1] if np.ndim(y_train) > 1 else 1)
+    model.fit(X_train, y_train, validation_data=(X_val, y_val), epochs=epochs, batch_size=batch_size, verbose=0)
+    return model
+
+
+def gp_method(method, n_rows):
+    """The backend that `method` means for a training set of n_rows"""
+    if method not in GP_METHODS:
+        raise ValueError(f"Unknown GP method '{method}' (one of {', '.join(GP_METHODS)})")
+    if method == 'auto':
+        return 'exact' if n_rows <= EXACT_GP_MAX_ROWS else 'approx'
+    return method
+
+
+def fit_gpr(X_train, y_train, seed=SEED, method='exact'):
+    """
+    GP regression with an RBF kernel, alpha picked by a 3-fold search. 'exact' is the notebook's
+    GaussianProcessRegressor(C * RBF) in a randomized search; 'approx' a RandomFourierGP.
+    """
+    if gp_method(method, len(X_train)) == 'approx':
+        from vitalair.gp import fit_random_fourier_gp
+        return fit_random_fourier_gp(X_train, y_train, GPR_ALPHAS, folds=GPR_SEARCH_FOLDS, seed=seed)
+    from sklearn.gaussian_process import GaussianProcessRegressor
+    from sklearn.gaussian_process.kernels import RBF, ConstantKernel as C
+    from sklearn.model_selection import RandomizedSearchCV
+    gpr = GaussianProcessRegressor(kernel=C(1.0) * RBF(), random_state=seed)
+    search = RandomizedSearchCV(gpr, {'alpha': GPR_ALPHAS}, n_iter=GPR_SEARCH_ITERATIONS, cv=GPR_SEARCH_FOLDS,
+                                random_state=seed)
+    search.fit(X_train, y_train)
+    return search.best_estimator_
+
+
+def update_nbeats(model, X_new, y_new, epochs, batch_size=BATCH_SIZE):
+    """Continue training a fitted model (and its optimizer state) on new rows only"""
+    model.fit(X_new, y_new, epochs=epochs, batch_size=batch_size, verbose=0)
+    return model
+
+
+def update_gpr(gpr, X_new, y_new):
+    """
+    The GP with new training rows: the approximate GP adds them to its sufficient statistics; the exact
+    one is refit on all its rows with its fitted kernel, without the kernel optimization and alpha search.
+    """
+    if hasattr(gpr, 'partial_fit'):
+        return gpr.partial_fit(X_new, y_new)
+    from sklearn.base import clone
+    refit = clone(gpr).set_params(kernel=gpr.kernel_, optimizer=None)
+    return refit.fit(np.concatenate([gpr.X_train_, X_new]), np.concatenate([gpr.y_train_, y_new]))
+
+
+def r2(y_true, y_pred):
+    y_true = np.asarray(y_true, dtype=np.float64)
+    return 1.0 - np.sum((y_true - y_pred) ** 2) / np.sum((y_true - y_true.mean()) ** 2)
+
+
+def evaluate(y_true, y_pred):
+    """MAE, MAPE (%), RMSE and R² of a prediction"""
+    y_true = np.asarray(y_true, dtype=np.float64)
+    y_pred = np.asarray(y_pred, dtype=np.float64)
+    errors = y_true - y_pred
+    return {
+        'mae': float(np.mean(np.abs(errors))),
+        'mape': float(np.mean(np.abs(errors / y_true)) * 100),
+        'rmse': float(np.sqrt(np.mean(errors ** 2))),
+        'r2': float(r2(y_true, y_pred)),
+    }
+
+
+def ensemble_weights(y_true, nbeats_pred, gpr_pred):
+    """Weights of the two models, proportional to their R² on held-out data (equal if neither explains anything)"""
+    scores = np.array([max(r2(y_true, nbeats_pred), 0.0), max(r2(y_true, gpr_pred), 0.0)])
+    if scores.sum() == 0:
+        return 0.5, 0.5
+    w1, w2 = scores / scores.sum()
+    return float(w1), float(w2)
@@ -0,0 +1,331 @@
+import os
+import json
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from utils import load_data, build_forecast
+from vitalair import models, forecast
+from vitalair.data import FEATURES, STATIONS_DIR, TARGET, read_station, station_files
+
+logger = logging.getLogger(__name__)
+
+# Model directories, relative to the results directory: the notebook's same-day ensemble of each station,
+# kept for its per-station test metrics (no forecast reads it), and STEP_MODEL
+MODELS_DIR = "models"
+# The next-day ensemble of all stations that produces the forecasts, relative to MODELS_DIR
+STEP_MODEL = "step"
+# The AQI forecast of all stations with the columns Date, AQI_Forecast, Location, relative to the data directory
+COMBINED_AQI_FILE = "combined_AQI_forecast.csv"
+# Days of new observations after the last full training at which an update retrains everything instead
+FULL_RETRAIN_DAYS = 28
+# HRI = AQI / the HRI_QUANTILE of every station's AQI forecast (notebooks/HRI_calculation.ipynb)
+HRI_QUANTILE = 0.75
+
+
+def _write_csv(df, path):
+    tmp_path = path + ".tmp"
+    df.to_csv(tmp_path, index=False, date_format='%Y-%m-%d')
+    os.replace(tmp_path, path)
+
+
+def station_model_dir(results_dir, location):
+    return os.path.join(results_dir, MODELS_DIR, location)
+
+
+def _init_worker(threads, seed):
+    """Quiet, seeded TensorFlow limited to `threads` threads, so one worker per core does not oversubscribe the machine"""
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    import warnings
+    import tensorflow as tf
+    from sklearn.exceptions import ConvergenceWarning
+
+    # The kernel hyperparameters often end at their bounds; one warning per optimizer restart is just noise here
+    warnings.filterwarnings('ignore', category=ConvergenceWarning)
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(threads)
+    tf.keras.utils.set_random_seed(seed)
+
+
+def train_station(location, path, results_dir, epochs=models.EPOCHS, seed=models.SEED, threads=1, gp='auto'):
+    """
+    Train the same-day ensemble of one station (AQI from that day's pollutants, as in the notebook) and
+    write its model artifacts and test metrics into results_dir, to compare the stations and the notebook's
+    results; the forecasts come from the next-day ensemble. Runs in a pool worker, with TensorFlow and the
+    BLAS libraries limited to `threads` threads each.
+    """
+    import joblib
+    from sklearn.model_selection import train_test_split
+    from threadpoolctl import threadpool_limits
+
+    start = time.perf_counter()
+    _init_worker(threads, seed)
+    df = read_station(path)
+    features, target = df[FEATURES], df[TARGET]
+    # Random 60/20/20 train/validation/test split, as in the notebook
+    X_train, X_temp, y_train, y_temp = train_test_split(features, target, test_size=0.4, random_state=seed)
+    X_val, X_test, y_val, y_test = train_test_split(X_temp, y_temp, test_size=0.5, random_state=seed)
+
+    with threadpool_limits(limits=threads):
+        nbeats = models.fit_nbeats(X_train, y_train, X_val, y_val, epochs=epochs)
+        gp = models.gp_method(gp, len(X_train))
+        gpr = models.fit_gpr(X_train, y_train, seed=seed, method=gp)
+        nbeats_pred = nbeats.predict(X_test, verbose=0).flatten()
+        gpr_pred = gpr.predict(X_test)
+        w1, w2 = models.ensemble_weights(y_test, nbeats_pred, gpr_pred)
+        ensemble_pred = w1 * nbeats_pred + w2 * gpr_pred
+
+    model_dir = station_model_dir(results_dir, location)
+    os.makedirs(model_dir, exist_ok=True)
+    nbeats.save(os.path.join(model_dir, "nbeats.keras"))
+    joblib.dump(gpr, os.path.join(model_dir, "gpr.joblib"))
+    metrics = {
+        'nbeats': models.evaluate(y_test, nbeats_pred),
+        'gpr': models.evaluate(y_test, gpr_pred),
+        'ensemble': models.evaluate(y_test, ensemble_pred),
+    }
+    seconds = time.perf_counter() - start
+    summary = {
+        'location': location,
+        'source': os.path.abspath(path),
+        'rows': len(df),
+        'last_date': df.index[-1].strftime('%Y-%m-%d'),
+        'features': FEATURES,
+        'weights': {'nbeats': w1, 'gpr': w2},
+        'gp': gp,
+        'gpr_alpha': float(gpr.alpha),
+        'metrics': metrics,
+        'epochs': epochs,
+        'seed': seed,
+        'trained_at': datetime.now().isoformat(timespec='seconds'),
+        'seconds': seconds,
+    }
+    with open(os.path.join(model_dir, "model.json"), 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def train_forecaster(files, results_dir, lags=forecast.LAGS, horizon=forecast.HORIZON, epochs=models.EPOCHS,
+                     seed=models.SEED, threads=1, gp='auto'):
+    """
+    Train the next-day ensemble of all the stations in files ({location: path}), save it and roll it
+    forward `horizon` days. Runs in a pool worker. Returns its summary and the forecast frame.
+    """
+    from threadpoolctl import threadpool_limits
+
+    start = time.perf_counter()
+    _init_worker(threads, seed)
+    options = {'lags': lags, 'epochs': epochs, 'seed': seed, 'gp': gp}
+    frames = {location: read_station(path) for location, path in files.items()}
+    with threadpool_limits(limits=threads):
+        step, gp, metrics = forecast.fit_step_ensemble(frames, lags, epochs=epochs, seed=seed, gp=gp)
+        table = forecast.forecast(step, frames, horizon)
+    step.save(station_model_dir(results_dir, STEP_MODEL))
+    summary = {
+        'location': STEP_MODEL,
+        'rows': sum(len(df) for df in frames.values()),
+        'lags': lags,
+        'horizon': horizon,
+        'weights': {'nbeats': step.weights[0], 'gpr': step.weights[1]},
+        'gp': gp,
+        'gpr_alpha': float(step.gpr.alpha),
+        'metrics': metrics,
+        'epochs': epochs,
+        'seed': seed,
+        # The train_all options, repeated by the full retraining of update_all ('gp' above is the backend they chose)
+        'options': options,
+        'trained_at': datetime.now().isoformat(timespec='seconds'),
+        'seconds': time.perf_counter() - start,
+    }
+    with open(os.path.join(station_model_dir(results_dir, STEP_MODEL), "model.json"), 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary, table
+
+
+def write_aqi_results(table, data_dir):
+    """
+    Write the per-station AQI forecast files of a forecast frame, then the combined AQI forecast of every
+    station in the results (the Date, AQI_Forecast, Location file of the data directory)
+    """
+    aqi_dir = os.path.join(data_dir, build_forecast.RESULTS_DIR, build_forecast.AQI_RESULTS)
+    os.makedirs(aqi_dir, exist_ok=True)
+    for location, df in table.groupby('Location', sort=False):
+        _write_csv(df[['Date', 'AQI_Forecast']], os.path.join(aqi_dir, f"AQI_forecast_{location}.csv"))
+    frames = []
+    for filename in sorted(os.listdir(aqi_dir)):
+        match = build_forecast.AQI_PATTERN.match(filename)
+        if match:
+            frames.append(pd.read_csv(os.path.join(aqi_dir, filename)).assign(Location=match.group(1)))
+    combined = pd.concat(frames, ignore_index=True)[['Date', 'AQI_Forecast', 'Location']]
+    combined.sort_values(by=['Location', 'Date'], inplace=True, kind='stable')
+    _write_csv(combined, os.path.join(data_dir, COMBINED_AQI_FILE))
+
+
+def write_hri_results(results_dir, reference_aqi=None):
+    """
+    Write the HRI file of every station's AQI forecast: HRI = AQI / reference_aqi, by default the
+    HRI_QUANTILE of all the AQI forecasts. Returns the reference used.
+    """
+    aqi_dir = os.path.join(results_dir, build_forecast.AQI_RESULTS)
+    hri_dir = os.path.join(results_dir, build_forecast.HRI_RESULTS)
+    forecasts = {}
+    for filename in sorted(os.listdir(aqi_dir)):
+        match = build_forecast.AQI_PATTERN.match(filename)
+        if match:
+            forecasts[match.group(1)] = pd.read_csv(os.path.join(aqi_dir, filename))
+    if reference_aqi is None:
+        reference_aqi = float(np.quantile(np.concatenate([df['AQI_Forecast'].to_numpy() for df in forecasts.values()]),
+                                          HRI_QUANTILE))
+    os.makedirs(hri_dir, exist_ok=True)
+    for location, df in forecasts.items():
+        df['HRI'] = df['AQI_Forecast'] / reference_aqi
+        _write_csv(df[['Date', 'AQI_Forecast', 'HRI']], os.path.join(hri_dir, f"HRI_forecast_{location}.csv"))
+    return reference_aqi
+
+
+def default_workers():
+    return len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+
+
+def _build(data_dir):
+    reference_aqi = write_hri_results(os.path.join(data_dir, build_forecast.RESULTS_DIR))
+    logger.info(f"Wrote the HRI forecasts (reference AQI {reference_aqi:.5f})")
+    build_forecast.build(data_dir)
+
+
+def train_all(locations=None, data_dir=None, workers=None, epochs=models.EPOCHS, seed=models.SEED, build=True,
+              gp='auto', lags=forecast.LAGS, horizon=forecast.HORIZON, station_models=True):
+    """
+    Train the next-day ensemble of every station file and the same-day models of every station (or the
+    given locations; none without station_models) in a pool of worker processes, then write the AQI
+    forecasts, the HRI files and rebuild the joined forecast table. The next-day ensemble always sees every
+    station, so a partial run does not replace it with one that forecasts fewer. It gets the `workers`
+    cores the same-day models, one core each, leave free.
+    Returns (summaries, failed locations, wall seconds); the next-day ensemble's summary has the location STEP_MODEL.
+    """
+    data_dir = os.path.abspath(data_dir or load_data.DIR)
+    results_dir = os.path.join(data_dir, build_forecast.RESULTS_DIR)
+    files = station_files(os.path.join(data_dir, STATIONS_DIR))
+    stations = files if station_models else {}
+    if locations:
+        unknown = sorted(set(locations) - set(files))
+        if unknown:
+            raise ValueError(f"No training file for {', '.join(unknown)} (known: {', '.join(files)})")
+        stations = {location: files[location] for location in locations if location in stations}
+    cores = workers or default_workers()
+    workers = max(1, min(cores, len(stations) + 1))
+    forecaster_threads = max(1, cores - (workers - 1))
+    logger.info(f"Training the next-day ensemble of {len(files)} stations ({forecaster_threads} threads) and "
+                f"{len(stations)} same-day models on {workers} worker processes")
+
+    start = time.perf_counter()
+    summaries, failed, table = [], [], None
+    # spawn: TensorFlow is not fork-safe, and each worker gets a clean interpreter
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        # The next-day ensemble sees every station and takes longest, so it starts first
+        futures = {executor.submit(train_forecaster, files, results_dir, lags, horizon, epochs, seed,
+                                   forecaster_threads, gp): STEP_MODEL}
+        futures.update({executor.submit(train_station, location, path, results_dir, epochs, seed, 1, gp): location
+                        for location, path in stations.items()})
+        for future in as_completed(futures):
+            location = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Training {location} failed: {e}")
+                failed.append(location)
+                continue
+            summary, table = result if location == STEP_MODEL else (result, table)
+            summaries.append(summary)
+            logger.info(f"Trained {location} in {summary['seconds']:.1f} s "
+                        f"(ensemble MAE {summary['metrics']['ensemble']['mae']:.3f}, R² {summary['metrics']['ensemble']['r2']:.3f})")
+    wall = time.perf_counter() - start
+
+    if table is not None:
+        write_aqi_results(table, data_dir)
+        if build:
+            _build(data_dir)
+    return sorted(summaries, key=lambda summary: (summary['location'] == STEP_MODEL, summary['location'])), sorted(failed), wall
+
+
+def forecast_all(data_dir=None, horizon=forecast.HORIZON, build=True):
+    """
+    Forecast every station with the saved next-day ensemble from its latest observations, without
+    retraining, and write the AQI forecasts (and the HRI files and forecast table). Returns the forecast frame.
+    """
+    data_dir = os.path.abspath(data_dir or load_data.DIR)
+    step = forecast.StepEnsemble.load(station_model_dir(os.path.join(data_dir, build_forecast.RESULTS_DIR), STEP_MODEL))
+    files = station_files(os.path.join(data_dir, STATIONS_DIR))
+    new = sorted(set(files) - set(step.locations))
+    if new:
+        logger.warning(f"No model for {', '.join(new)}: they are not forecast until python -m vitalair update "
+                       f"retrains the models")
+    table = forecast.forecast(step, {location: read_station(files[location]) for location in step.locations
+                                     if location in files}, horizon)
+    write_aqi_results(table, data_dir)
+    if build:
+        _build(data_dir)
+    return table
+
+
+def saved_options(model_dir):
+    """The lags, epochs, seed and gp the saved next-day ensemble was trained with ({} without one)"""
+    path = os.path.join(model_dir, "model.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        summary = json.load(f)
+    # Models trained before the options were recorded: their lags, epochs and seed, and the default gp
+    return summary.get('options') or {name: summary[name] for name in ('lags', 'epochs', 'seed') if name in summary}
+
+
+def update_all(data_dir=None, full_every=FULL_RETRAIN_DAYS, epochs=forecast.UPDATE_EPOCHS, horizon=forecast.HORIZON,
+               build=True, full=False, workers=None):
+    """
+    Bring the next-day ensemble up to date with the station files and forecast again. The models are
+    updated incrementally with the new days (forecast.update_step_ensemble) unless `full` is set, there is
+    no saved model yet, stations were added or removed since it was trained, or the newest observation is
+    full_every or more days after the last full training:
+    then it is retrained with train_all, with the options of the saved model (without the same-day models,
+    which no forecast uses).
+    Returns a summary with the 'mode' ('update' or 'full').
+    """
+    data_dir = os.path.abspath(data_dir or load_data.DIR)
+    model_dir = station_model_dir(os.path.join(data_dir, build_forecast.RESULTS_DIR), STEP_MODEL)
+    files = station_files(os.path.join(data_dir, STATIONS_DIR))
+    start = time.perf_counter()
+    step = None
+    if not full and os.path.exists(os.path.join(model_dir, "step.json")):
+        step = forecast.StepEnsemble.load(model_dir)
+        added, removed = sorted(set(files) - set(step.locations)), sorted(set(step.locations) - set(files))
+        if added or removed:
+            # The model only knows the scaling of the stations it was trained on
+            logger.info(f"Stations added ({', '.join(added) or 'none'}) or removed ({', '.join(removed) or 'none'}) "
+                        f"since the last full training: retraining everything")
+            step = None
+        else:
+            frames = {location: read_station(files[location]) for location in step.locations}
+            newest = max(df.index.max() for df in frames.values())
+            days = (newest - pd.Timestamp(step.full_last_date)).days
+            if days >= full_every:
+                logger.info(f"Last full training {days} days before the newest observation: retraining everything")
+                step = None
+
+    if step is None:
+        options = saved_options(model_dir)
+        logger.info(f"Retraining the next-day ensemble with {options or 'the default options'}")
+        summaries, failed, wall = train_all(data_dir=data_dir, workers=workers, build=build, horizon=horizon,
+                                            station_models=False, **options)
+        return {'mode': 'full', 'seconds': wall, 'failed': failed}
+
+    windows = forecast.update_step_ensemble(step, frames, epochs)
+    step.save(model_dir)
+    write_aqi_results(forecast.forecast(step, frames, horizon), data_dir)
+    if build:
+        _build(data_dir)
+    return {'mode': 'update', 'windows': windows, 'updates': step.updates, 'full_last_date': step.full_last_date,
+            'last_date': max(step.last_dates.values()), 'seconds': time.perf_counter() - start}
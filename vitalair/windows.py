@@ -0,0 +1,74 @@
+import numpy as np
+
+# Past days per training window of the sequence models (notebooks/model.ipynb)
+SEQUENCE_LENGTH = 30
+
+
+def sliding_windows(values, length):
+    """
+    Read-only view of every `length`-row window of values: shape (len(values) - length + 1, length, n_columns)
+    for 2-D values, (len(values) - length + 1, length) for 1-D ones. Nothing is copied.
+    """
+    values = np.asarray(values)
+    windows = np.lib.stride_tricks.sliding_window_view(values, length, axis=0)
+    # sliding_window_view puts the window axis last; the sequence models want (window, time, column)
+    return windows.swapaxes(1, 2) if values.ndim == 2 else windows
+
+
+def create_sequences(data, length=SEQUENCE_LENGTH, target=-1):
+    """
+    The notebook's training pairs as views of data: X[i] = data[i:i + length], y[i] = data[i + length, target].
+    Copy them (np.array) only if they must outlive or be written to independently of data.
+    """
+    data = np.asarray(data)
+    return sliding_windows(data[:-1], length), data[length:, target]
+
+
+class WindowDataset:
+    """
+    Training windows of several stations. The stations' rows are stored once, back to back, and a window
+    is just the index of its first row; windows crossing from one station into the next are left out.
+    X of window i is the `length` rows from starts[i], y the target column of the row after them
+    (target may also be a list or slice of columns, e.g. slice(None) for the whole next row).
+    """
+
+    def __init__(self, arrays, length=SEQUENCE_LENGTH, target=-1, dtype=np.float32):
+        arrays = [np.asarray(array) for array in arrays]
+        sizes = np.array([len(array) for array in arrays], dtype=np.int64)
+        offsets = np.cumsum(sizes) - sizes
+        self.length = length
+        self.target = target
+        # The only copy of the rows, cast while concatenating
+        self.values = np.concatenate(arrays, dtype=dtype) if arrays else np.empty((0, 0), dtype=dtype)
+        self.windows = (sliding_windows(self.values, length) if len(self.values) >= length
+                        else np.empty((0, length) + self.values.shape[1:], dtype=dtype))
+        counts = np.maximum(sizes - length, 0)
+        self.starts = (np.repeat(offsets, counts)
+                       + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+        self.stations = np.repeat(np.arange(len(arrays)), counts)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        """(X, y) of the window(s) at index: an int, a slice or an array of window indices (copies only those)"""
+        starts = self.starts[index]
+        return self.windows[starts], self.values[starts + self.length, self.target]
+
+    def split(self, fractions=(0.6, 0.2, 0.2), seed=None):
+        """Window indices shuffled and cut in the given fractions (the notebook's random 60/20/20 split)"""
+        indices = np.random.default_rng(seed).permutation(len(self))
+        bounds = np.round(np.cumsum(fractions)[:-1] / np.sum(fractions) * len(indices)).astype(np.int64)
+        return np.split(indices, bounds)
+
+    def batches(self, batch_size, indices=None, shuffle=False, seed=None):
+        """Generate (X, y) batches of the given window indices (all by default); each batch is built when requested"""
+        indices = np.arange(len(self)) if indices is None else np.asarray(indices)
+        if shuffle:
+            indices = np.random.default_rng(seed).permutation(indices)
+        for start in range(0, len(indices), batch_size):
+            yield self[indices[start:start + batch_size]]
+
+    def arrays(self, indices=None):
+        """(X, y) of the given windows (all by default) as ordinary arrays, e.g. for model.predict"""
+        return self[np.arange(len(self)) if indices is None else np.asarray(indices)]